@@ -1,8 +1,9 @@
 import datetime
-import json
-from pathlib import Path
+from typing import Any, Optional
 
-from util import normalize_time
+import profiling
+from savefs import SaveFS
+from util import json_loads, normalize_time
 
 
 class SpeedrunIGTInfo:
@@ -11,25 +12,52 @@ class SpeedrunIGTInfo:
     version: str
     category: str
     run_type: str
+    # None if the record doesn't have them, e.g. it was written before the run finished
+    igt_ms: Optional[int]
+    rta_ms: Optional[int]
+    final_igt_ms: Optional[int]
+    # when the mod wrote the record, at the end of the run, unix time in milliseconds. None in records without it
+    date_ms: Optional[int]
+    # name, igt and rta of each split
+    timelines: list[tuple[str, int, int]]
     result_parts: list[str]
 
-    def __init__(self, folder: Path):
+    def __init__(self, fs: SaveFS, folder: str = "speedrunigt"):
         """
         parses SpeedrunIGT information, if present
 
-        :param folder: the speedrunigt/ folder in a save
+        :param fs: the save
+        :param folder: the speedrunigt/ folder in the save
         """
-        if folder is None:
+        if fs is None or not fs.exists(folder):
             raise FileNotFoundError("speedrunigt folder not present")
-        record: dict = json.loads(folder.joinpath("record.json").read_text())
+        with profiling.span("speedrunigt"):
+            self.parse(json_loads(fs.read_buffer(folder + "/record.json")))
+
+    def parse(self, record: dict):
         self.version = record.get("speedrunigt_version")
-        self.category = record.get("category").lower()
+        self.category = (record.get("category") or "unknown").lower()
         self.run_type = record.get("run_type")
-        self.igt = normalize_time(str(datetime.timedelta(milliseconds=record.get("retimed_igt"))))
-        self.rta = normalize_time(str(datetime.timedelta(milliseconds=record.get("final_rta"))))
-
-        # log = folder.joinpath("logs/igt_timer.log").read_text()
-        # result_line: str = next(filter(lambda line: line.startswith("Result > "), log.splitlines()))
-        # self.result_parts = result_line.replace("Result > ", "").split(",")
-        # self.igt = self.result_parts[0].replace("IGT: ", "")
-        # self.rta = self.result_parts[1]
+        self.igt_ms = record.get("retimed_igt")
+        self.rta_ms = record.get("final_rta")
+        self.final_igt_ms = record.get("final_igt")
+        self.date_ms = record.get("date")
+        self.timelines = [(timeline.get("name"), timeline.get("igt"), timeline.get("rta")) for timeline in record.get("timelines") or []]
+        self.igt = self.show(self.igt_ms)
+        self.rta = self.show(self.rta_ms)
+
+    @staticmethod
+    def show(ms: Optional[int]) -> str:
+        # a missing time is reported by the timeline checks (see log.Timeline.finish), not here
+        return "unknown" if ms is None else normalize_time(str(datetime.timedelta(milliseconds=ms)))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": self.version,
+            "category": self.category,
+            "run_type": self.run_type,
+            "igt": self.igt,
+            "rta": self.rta,
+            "igt_ms": self.igt_ms,
+            "rta_ms": self.rta_ms
+        }
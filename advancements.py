@@ -0,0 +1,133 @@
+import sys
+from typing import Any, Iterable, Iterator, Optional
+
+from savefs import SaveFS
+from util import json_loads as loads
+
+FOLDER = "advancements"
+
+# a hand-picked list of vanilla advancements from 1.12 to 1.20: the story, nether and end tabs and the adventure and
+# husbandry advancements runs most often get. it isn't complete, names that aren't in it (the rest of vanilla, mods,
+# datapacks, newer versions) cost a string each in AdvancementSet.extra. an advancement's bit in an AdvancementSet is
+# its index here so only ever append to this (and bump result_cache.VERSION if anything else changes)
+REGISTRY = [f"minecraft:{name}" for name in [
+    "story/root", "story/mine_stone", "story/upgrade_tools", "story/smelt_iron", "story/obtain_armor",
+    "story/lava_bucket", "story/iron_tools", "story/deflect_arrow", "story/form_obsidian", "story/mine_diamond",
+    "story/enter_the_nether", "story/shiny_gear", "story/enchant_item", "story/cure_zombie_villager",
+    "story/follow_ender_eye", "story/enter_the_end",
+    "nether/root", "nether/return_to_sender", "nether/find_bastion", "nether/obtain_ancient_debris",
+    "nether/fast_travel", "nether/find_fortress", "nether/obtain_crying_obsidian", "nether/distract_piglin",
+    "nether/ride_strider", "nether/uneasy_alliance", "nether/loot_bastion", "nether/use_lodestone",
+    "nether/netherite_armor", "nether/get_wither_skull", "nether/obtain_blaze_rod", "nether/charge_respawn_anchor",
+    "nether/ride_strider_in_overworld_lava", "nether/explore_nether", "nether/summon_wither", "nether/brew_potion",
+    "nether/create_beacon", "nether/all_potions", "nether/create_full_beacon", "nether/all_effects",
+    "end/root", "end/kill_dragon", "end/dragon_egg", "end/enter_end_gateway", "end/respawn_dragon",
+    "end/dragon_breath", "end/find_end_city", "end/elytra", "end/levitate",
+    "adventure/root", "adventure/voluntary_exile", "adventure/spyglass_at_parrot", "adventure/kill_a_mob",
+    "adventure/trade", "adventure/honey_block_slide", "adventure/ol_betsy",
+    "adventure/lightning_rod_with_villager_no_fire", "adventure/fall_from_world_height", "adventure/salvage_sherd",
+    "adventure/avoid_vibration", "adventure/sleep_in_bed", "adventure/hero_of_the_village",
+    "adventure/spyglass_at_ghast", "adventure/throw_trident", "adventure/kill_mob_near_sculk_catalyst",
+    "adventure/shoot_arrow", "adventure/kill_all_mobs", "adventure/totem_of_undying", "adventure/summon_iron_golem",
+    "adventure/trade_at_world_height", "adventure/trim_with_all_exclusive_armor_patterns",
+    "adventure/two_birds_one_arrow", "adventure/whos_the_pillager_now", "adventure/arbalistic",
+    "adventure/craft_decorated_pot_using_only_sherds", "adventure/adventuring_time",
+    "adventure/play_jukebox_in_meadows", "adventure/walk_on_powder_snow_with_leather_boots",
+    "adventure/spyglass_at_dragon", "adventure/very_very_frightening", "adventure/sniper_duel", "adventure/bullseye",
+    "adventure/trim_with_any_armor_pattern", "adventure/read_power_of_chiseled_bookshelf",
+    "husbandry/root", "husbandry/safely_harvest_honey", "husbandry/breed_an_animal",
+    "husbandry/allay_deliver_item_to_player", "husbandry/ride_a_boat_with_a_goat", "husbandry/tame_an_animal",
+    "husbandry/make_a_sign_glow", "husbandry/fishy_business", "husbandry/silk_touch_nest",
+    "husbandry/tadpole_in_a_bucket", "husbandry/obtain_sniffer_egg", "husbandry/plant_seed", "husbandry/wax_on",
+    "husbandry/bred_all_animals", "husbandry/allay_deliver_cake_to_note_block", "husbandry/complete_catalogue",
+    "husbandry/tactical_fishing", "husbandry/leash_all_frog_variants", "husbandry/feed_snifflet",
+    "husbandry/balanced_diet", "husbandry/obtain_netherite_hoe", "husbandry/wax_off", "husbandry/axolotl_in_a_bucket",
+    "husbandry/froglights", "husbandry/plant_any_sniffer_seed", "husbandry/kill_axolotl_target",
+    "husbandry/break_diamond_hoe"
+]]
+INDEX = {name: i for i, name in enumerate(REGISTRY)}
+
+_NO_EXTRA: frozenset[str] = frozenset()
+
+
+class AdvancementSet:
+    """
+    a set of advancement names kept as a bitset over REGISTRY, an int instead of a set of strings per save. names that
+    aren't registered (mods, datapacks, newer versions) are kept as interned strings next to it
+    """
+    __slots__ = ("bits", "extra")
+
+    def __init__(self, names: Iterable[str] = ()):
+        bits = 0
+        extra = []
+        for name in names:
+            i = INDEX.get(name)
+            if i is None:
+                extra.append(sys.intern(name))
+            else:
+                bits |= 1 << i
+        self.bits = bits
+        self.extra = frozenset(extra) if extra else _NO_EXTRA
+
+    def __contains__(self, name: str) -> bool:
+        i = INDEX.get(name)
+        return name in self.extra if i is None else bool(self.bits >> i & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            yield REGISTRY[low.bit_length() - 1]
+            bits ^= low
+        yield from self.extra
+
+    def __len__(self) -> int:
+        return self.bits.bit_count() + len(self.extra)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, AdvancementSet):
+            return self.bits == other.bits and self.extra == other.extra
+        return set(self) == other
+
+    def __repr__(self) -> str:
+        return f"AdvancementSet({sorted(self)!r})"
+
+
+def is_advancement(name: str) -> bool:
+    """
+    whether a key of an advancements file is a real advancement, recipe unlocks are stored as advancements too and
+    keys without a category (DataVersion) aren't advancements at all
+    """
+    return "/" in name and not name.startswith("minecraft:recipe")
+
+
+def advancement_names(data: dict[str, Any], done_only: bool = True) -> list[str]:
+    """
+    :param data: a parsed advancements file
+    :param done_only: only advancements that have been completed
+    """
+    # the name is checked first so the progress of recipes (most of a late game file) is never looked at
+    if done_only:
+        return [name for name, progress in data.items() if is_advancement(name) and progress["done"] is True]
+    return [name for name in data if is_advancement(name)]
+
+
+def parse(contents: bytes, done_only: bool = True) -> list[str]:
+    """
+    :param contents: the contents of an advancements file
+    :param done_only: only advancements that have been completed
+    """
+    return advancement_names(loads(contents), done_only)
+
+
+def read(fs: SaveFS, files: Optional[Iterable[str]] = None) -> AdvancementSet:
+    """
+    :param fs: the save
+    :param files: the files in the advancements folder to read, all of them if None
+    :return: every advancement completed by any player of the save
+    """
+    return AdvancementSet(
+        name
+        for file in (fs.listdir(FOLDER) if files is None else files)
+        for name in parse(fs.read_buffer(f"{FOLDER}/{file}"))
+    )
@@ -0,0 +1,196 @@
+from concurrent.futures import as_completed
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
+
+import players
+import profiling
+from result_cache import ResultCache, stamp
+from save import WorldSave
+import savefs
+from savefs import open_save
+
+if TYPE_CHECKING:
+    # multiprocessing is only imported once there are workers to start
+    from concurrent.futures import ProcessPoolExecutor
+
+Result = Union[WorldSave, Exception]
+
+
+def verify(save_folder: Path, resolve_players: bool = True, fields: Optional[list[str]] = None) -> Result:
+    """
+    builds a WorldSave, returning the exception instead of raising it so that one broken save doesn't end a batch
+
+    :param save_folder: the save to verify
+    :param resolve_players: passed on to WorldSave
+    :param fields: the fields that will be rendered, only their sections are read (all if None)
+    """
+    try:
+        with profiling.span("verify"):
+            save = WorldSave(save_folder, resolve_players)
+            save.load(fields)
+            save.close()
+        return save
+    except Exception as e:
+        return e
+
+
+def stamp_and_verify(save_folder: Path, resolve_players: bool, fields: Optional[list[str]],
+                     stamped: bool) -> tuple[Result, Optional[str]]:
+    """
+    verify, and if stamped, the save's result_cache.stamp from before it was read, so that a save that changes while
+    it's verified isn't stored with the old verdict under the new stamp
+
+    :return: the result and the stamp, None if it wasn't wanted or the save couldn't be stamped
+    """
+    save_stamp = None
+    if stamped:
+        with profiling.span("result cache"):
+            try:
+                save_stamp = stamp(save_folder)
+            except Exception:
+                # the save isn't stored, verify reports what's wrong with it
+                pass
+    return verify(save_folder, resolve_players, fields), save_stamp
+
+
+def _verify_in_worker(save_folder: Path, resolve_players: bool, fields: Optional[list[str]],
+                      stamped: bool) -> tuple[Result, Optional[str], list[profiling.Span]]:
+    # the spans recorded in a worker are sent back with its result
+    return *stamp_and_verify(save_folder, resolve_players, fields, stamped), profiling.drain()
+
+
+def _init_worker(config: players.LookupConfig, profile: bool, io_mode: str):
+    players.configure(config)
+    savefs.configure(io_mode)
+    if profile:
+        profiling.enable()
+        # forked workers start with a copy of the parent's spans, which the parent already has
+        profiling.drain()
+
+
+def make_executor(jobs: int) -> "ProcessPoolExecutor":
+    """
+    a process pool set up like verify_all's, for callers that keep one around between batches
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(players.config, profiling.enabled, savefs.io_mode))
+
+
+def verify_all(save_folders: Iterable[Path], jobs: int = 1, ordered: bool = True, fields: Optional[list[str]] = None,
+               lookup_concurrency: Optional[int] = None, results: Optional[ResultCache] = None,
+               chunk_size: int = 256, executor: Optional["ProcessPoolExecutor"] = None) -> Iterator[tuple[Path, Result]]:
+    """
+    verifies every save, fanning out across a process pool if jobs > 1
+
+    save_folders is consumed lazily, chunk_size saves at a time, so it can be a generator that is still discovering saves
+
+    :param save_folders: the saves to verify
+    :param jobs: the number of worker processes, 1 verifies in this process
+    :param ordered: yield results in input order, otherwise in completion order (stored results come first)
+    :param fields: the fields that will be rendered, all of them if None
+    :param lookup_concurrency: resolve the player names of each chunk up front with this many requests in flight
+    (see resolve_names), if None they're looked up while each save is verified
+    :param results: where verified saves are stored, unchanged saves found in it aren't verified again
+    :param chunk_size: how many saves are read from save_folders at once
+    :param executor: a pool from make_executor to use instead of starting one for jobs, it's left running
+    """
+    owned = executor is None and jobs > 1
+    if owned:
+        executor = make_executor(jobs)
+    try:
+        for chunk in chunks(save_folders, max(chunk_size, jobs)):
+            yield from _verify_chunk(chunk, executor, ordered, fields, lookup_concurrency, results)
+    finally:
+        if owned:
+            executor.shutdown(cancel_futures=True)
+
+
+def chunks(iterable: Iterable[Path], size: int) -> Iterator[list[Path]]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _verify_chunk(save_folders: list[Path], executor: Optional["ProcessPoolExecutor"], ordered: bool,
+                  fields: Optional[list[str]], lookup_concurrency: Optional[int],
+                  results: Optional[ResultCache]) -> Iterator[tuple[Path, Result]]:
+    stored = {}
+    if results is not None:
+        with profiling.span("result cache"):
+            for save_folder in save_folders:
+                save = results.get(save_folder)
+                # a save stored by a run with fewer fields is verified again, rather than its other sections being read
+                # here one save at a time
+                if save is not None and not save.missing(fields):
+                    stored[save_folder] = save
+    pending = [save_folder for save_folder in save_folders if save_folder not in stored]
+
+    names = None
+    with_players = fields is None or "players" in fields
+    if lookup_concurrency is not None and with_players:
+        stored_uuids = [uuid for save in stored.values() for uuid in save.players]
+        names = resolve_names(pending, lookup_concurrency, stored_uuids)
+    if with_players:
+        # stored saves keep no names (see ResultCache.put)
+        for save in stored.values():
+            save.players = {uuid: players.lookup(uuid) if names is None else names.get(uuid, players.UNKNOWN)
+                            for uuid in save.players}
+    verified = _verify_all(pending, executor, ordered, names is None, fields, results is not None)
+
+    if not ordered:
+        yield from stored.items()
+    for save_folder in (save_folders if ordered else pending):
+        if save_folder in stored:
+            yield save_folder, stored[save_folder]
+            continue
+        save_folder, result, save_stamp = next(verified)
+        if isinstance(result, WorldSave):
+            if names is not None:
+                result.players = {uuid: names.get(uuid, players.UNKNOWN) for uuid in result.players}
+            # sections read later, e.g. after coming out of the result cache, are read on their own
+            result.resolve_players = True
+            if results is not None and save_stamp is not None:
+                with profiling.span("result cache"):
+                    results.put(save_folder, result, save_stamp)
+        yield save_folder, result
+
+
+def _verify_all(save_folders: list[Path], executor: Optional["ProcessPoolExecutor"], ordered: bool, resolve_players: bool,
+                fields: Optional[list[str]], stamped: bool) -> Iterator[tuple[Path, Result, Optional[str]]]:
+    if executor is None:
+        for save_folder in save_folders:
+            yield save_folder, *stamp_and_verify(save_folder, resolve_players, fields, stamped)
+        return
+
+    futures = {executor.submit(_verify_in_worker, save_folder, resolve_players, fields, stamped): save_folder
+               for save_folder in save_folders}
+    for future in (futures if ordered else as_completed(futures)):
+        save_folder = futures[future]
+        try:
+            result, save_stamp, spans = future.result()
+            profiling.merge(spans)
+            yield save_folder, result, save_stamp
+        except Exception as e:
+            # the worker itself died or the result couldn't be sent back
+            yield save_folder, e, None
+
+
+def resolve_names(save_folders: Iterable[Path], concurrency: int = players.DEFAULT_CONCURRENCY,
+                  uuids: Iterable[str] = ()) -> dict[str, str]:
+    """
+    collects the players of every save and resolves them all at once, so a batch waits for roughly one round trip
+    instead of one per player
+
+    :param uuids: players to resolve along with them, e.g. those of saves from the result cache
+    """
+    with profiling.span("resolve names"):
+        uuids = list(uuids)
+        for save_folder in save_folders:
+            try:
+                with open_save(save_folder) as fs:
+                    uuids.extend(WorldSave.player_uuids(fs))
+            except Exception:
+                # reported when the save itself is verified
+                pass
+        return players.resolve_all(uuids, concurrency)
@@ -0,0 +1,61 @@
+"""
+compares the old advancements filter with advancements.parse, with the standard json module and with orjson if it's
+installed
+
+usage: python benchmarks/advancements.py [--number N] [advancements/<uuid>.json ...]
+without arguments a late game 1.16 style advancements file is generated in memory
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import advancements
+from synthetic import advancements_file
+
+
+def synthetic_advancements() -> bytes:
+    """
+    a late game advancements file, which is mostly recipes
+    """
+    return json.dumps(advancements_file(random.Random(0), 90, 900, 4), indent=2).encode()
+
+
+def old_parse(contents: bytes) -> set[str]:
+    data = json.loads(contents)
+    return set(filter(lambda s: not s.startswith("minecraft:recipe") and "/" in s and data[s]["done"] == True, data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compares the old advancements filter with advancements.parse")
+    parser.add_argument("paths", type=Path, nargs="*", help="advancements files to parse instead of a generated one")
+    parser.add_argument("--number", type=int, default=200, help="parses per implementation, the average is reported")
+    args = parser.parse_args()
+    files = [(str(path), path.read_bytes()) for path in args.paths]
+    if not files:
+        files = [("synthetic", synthetic_advancements())]
+
+    for name, contents in files:
+        assert old_parse(contents) == set(advancements.parse(contents)), "advancements.parse differs from the old filter"
+        number = args.number
+        old_time = timeit.timeit(lambda: old_parse(contents), number=number) / number
+        json_time = timeit.timeit(lambda: advancements.advancement_names(json.loads(contents)), number=number) / number
+        print(f"{name} ({len(contents)} bytes, {len(advancements.parse(contents))} done)")
+        print(f"  old filter:          {old_time * 1000:8.3f} ms")
+        print(f"  parse, json:         {json_time * 1000:8.3f} ms ({old_time / json_time:.1f}x)")
+        if "orjson" in sys.modules:
+            fast_time = timeit.timeit(lambda: advancements.parse(contents), number=number) / number
+            print(f"  parse, orjson:       {fast_time * 1000:8.3f} ms ({old_time / fast_time:.1f}x)")
+        else:
+            print("  orjson isn't installed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+compares reading level.dat with nbtlib against nbt_stream with the spec WorldSave uses
+
+usage: python benchmarks/level_dat.py [--number N] [level.dat ...]
+without arguments a large modded level.dat is generated in a temporary directory
+
+tests/test_nbt_stream.py checks that both read the same values
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import nbtlib
+
+import nbt_stream
+from save import LEVEL_SPEC
+from synthetic import level_dat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compares reading level.dat with nbtlib and nbt_stream")
+    parser.add_argument("paths", type=Path, nargs="*", help="level.dat files to read instead of a generated one")
+    parser.add_argument("--number", type=int, default=20, help="reads per library, the average is reported")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = args.paths
+        if not paths:
+            paths = [Path(directory, "level.dat")]
+            # a heavily modded world, a full player inventory and a lot of per-mod data next to the keys that are read
+            level_dat("1.16.1", random.Random(0), 0, items=500, mods=200).save(paths[0])
+
+        for path in paths:
+            number = args.number
+            nbtlib_time = timeit.timeit(lambda: nbtlib.load(path), number=number) / number
+            stream_time = timeit.timeit(lambda: nbt_stream.load(path, LEVEL_SPEC), number=number) / number
+            print(f"{path} ({os.path.getsize(path)} bytes)")
+            print(f"  nbtlib.load:      {nbtlib_time * 1000:8.2f} ms")
+            print(f"  nbt_stream.load:  {stream_time * 1000:8.2f} ms ({nbtlib_time / stream_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+measures how many bytes each verified save keeps alive, as a WorldSave with every section loaded and as a report row
+
+usage: python benchmarks/memory.py [--count N] [--advancements N] [save ...]
+without saves, count saves of every kind in synthetic.KINDS are generated in a temporary directory and each is
+verified repeat times, like a batch of many similar saves
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import players
+from batch import verify
+from report import Report
+from synthetic import write_saves
+
+
+def retained(build: Callable[[], object]) -> int:
+    """
+    :return: the bytes still allocated once build returns, held by what it returned
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="measures the memory used per verified save")
+    parser.add_argument("saves", type=Path, nargs="*", help="saves to measure instead of generated ones")
+    parser.add_argument("--count", type=int, default=5, help="generated saves per kind of level.dat")
+    parser.add_argument("--repeat", type=int, default=200, help="times each save is verified")
+    parser.add_argument("--advancements", type=int, default=60, help="advancements per player in generated saves")
+    args = parser.parse_args()
+
+    players.configure(players.LookupConfig(cache_dir=None, offline=True))
+    with tempfile.TemporaryDirectory() as directory:
+        saves = args.saves or write_saves(Path(directory), args.count, advancements=args.advancements)
+        batch = [save for save in saves for _ in range(args.repeat)]
+        # warm up the caches that live for the whole process (gamerule index, interned strings) outside the measurement
+        verify(saves[0])
+
+        saves_bytes = retained(lambda: [verify(save) for save in batch])
+
+        def build_report():
+            report = Report()
+            for save in batch:
+                report.add(save, verify(save))
+            return report
+
+        report_bytes = retained(build_report)
+
+    print(f"{len(batch)} saves")
+    print(f"  WorldSave:   {saves_bytes / len(batch):10,.0f} bytes/save")
+    print(f"  report row:  {report_bytes / len(batch):10,.0f} bytes/save")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+measures region.scan_save: every chunk decompressed and only a sample of each region file, in this process and across
+worker processes
+
+usage: python benchmarks/regions.py [--regions N] [--chunks N] [--jobs N] [save ...]
+without saves, one with N region files of --chunks chunks each is generated in a temporary directory
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import players
+import region
+from batch import make_executor, verify
+from synthetic import write_save
+
+
+def main():
+    parser = argparse.ArgumentParser(description="measures scanning the region files of a save")
+    parser.add_argument("saves", type=Path, nargs="*", help="saves to scan instead of a generated one")
+    parser.add_argument("--regions", type=int, default=64, help="region files in the generated save")
+    parser.add_argument("--chunks", type=int, default=256, help="chunks per generated region file")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes for the parallel runs")
+    parser.add_argument("--sample", type=int, default=16, help="chunks decompressed per region file in the sampled runs")
+    args = parser.parse_args()
+
+    players.configure(players.LookupConfig(cache_dir=None, offline=True))
+    with tempfile.TemporaryDirectory() as directory:
+        saves = args.saves
+        if not saves:
+            saves = [Path(directory, "World")]
+            write_save(saves[0], "1.16.5", rng=random.Random(0), regions=args.regions, region_chunks=args.chunks)
+        executor = make_executor(args.jobs)
+        # start the workers before anything is timed
+        list(executor.map(abs, range(args.jobs)))
+        try:
+            for save_folder in saves:
+                save = verify(save_folder)
+                size = sum(path.stat().st_size for path in region.region_files(save_folder))
+                print(f"{save_folder.name} ({len(region.region_files(save_folder))} region files, {size / 1e6:.1f} MB)")
+                for name, pool, limit in [("every chunk, -j1", None, None), (f"every chunk, -j{args.jobs}", executor, None),
+                                          (f"{args.sample} per file, -j1", None, args.sample),
+                                          (f"{args.sample} per file, -j{args.jobs}", executor, args.sample)]:
+                    start = time.perf_counter()
+                    scan = region.scan_save(save_folder, save, pool, limit)
+                    elapsed = time.perf_counter() - start
+                    chunks = sum(result.read for result in scan.files)
+                    print(f"  {name:<20} {elapsed * 1000:9.1f} ms {chunks:8,} chunks read {chunks / elapsed:10,.0f} chunks/s")
+        finally:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+times each stage of verifying a save over a set of synthetic saves (see synthetic.py) and reports saves/sec for each,
+so that regressions and the effect of optimizations show up in one place
+
+usage: python benchmarks/run.py [--count N] [--players N] [--advancements N] [--mods N] [--jobs N] [--json] [save ...]
+without saves, count saves of every kind in synthetic.KINDS are generated in a temporary directory. everything runs
+offline, player names are never looked up
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import advancements
+import nbt_stream
+import players
+from batch import verify, verify_all
+from save import LEVEL_SPEC, WorldSave
+from savefs import open_save
+from seed_utils import is_random
+from SpeedrunIGTInfo import SpeedrunIGTInfo
+from synthetic import write_saves
+
+
+def best_of(repeat: int, function: Callable[[], None]) -> float:
+    """
+    :return: the fastest of repeat runs, in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def read_level_dat(save: Path) -> bytes:
+    with open_save(save) as fs:
+        return fs.read_bytes("level.dat")
+
+
+def stages(saves: list[Path], jobs: int) -> dict[str, Callable[[], None]]:
+    """
+    each stage runs over every save, with its inputs prepared up front so only the stage itself is timed
+    """
+    raw = [read_level_dat(save) for save in saves]
+    decompressed = [nbt_stream.decompress(data) for data in raw]
+    worlds = [WorldSave(save, False) for save in saves]
+    seeds = [world.seed for world in worlds]
+    # opened once, like a single verify does
+    filesystems = [open_save(save) for save in saves]
+
+    def gamerules():
+        for world in worlds:
+            world.__dict__.pop("gamerule_diff", None)
+            world.get_gamerule_text()
+
+    result = {
+        "read level.dat": lambda: [read_level_dat(save) for save in saves],
+        "gunzip": lambda: [nbt_stream.decompress(data) for data in raw],
+        "nbt decode": lambda: [nbt_stream.loads(data, LEVEL_SPEC) for data in decompressed],
+        "WorldSave()": lambda: [WorldSave(save, False) for save in saves],
+        "gamerules": gamerules,
+        "is_random": lambda: [is_random(seed) for seed in seeds],
+        "advancements": lambda: [advancements.read(fs) for fs in filesystems if fs.exists(advancements.FOLDER)],
+        "speedrunigt": lambda: [SpeedrunIGTInfo(fs) for fs in filesystems],
+        "players": lambda: [world.parse_players(fs) for world, fs in zip(worlds, filesystems)],
+        "verify + render": lambda: [verify(save).render() for save in saves],
+        f"verify_all -j{jobs}": lambda: [result.render() for _, result in verify_all(saves, jobs)]
+    }
+    try:
+        import nbtlib
+        # the full decode WorldSave used before nbt_stream, for reference against nbt decode
+        result["nbtlib decode"] = lambda: [nbtlib.File.from_fileobj(io.BytesIO(data)) for data in decompressed]
+    except ImportError:
+        pass
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmarks the stages of verifying a save")
+    parser.add_argument("saves", type=Path, nargs="*", help="saves to benchmark instead of generated ones")
+    parser.add_argument("--count", type=int, default=20, help="generated saves per kind of level.dat")
+    parser.add_argument("--players", type=int, default=1, help="players per generated save")
+    parser.add_argument("--advancements", type=int, default=40, help="advancements per player, on top of 300 recipes")
+    parser.add_argument("--mods", type=int, default=0, help="mods storing data in each generated level.dat")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="worker processes for the verify_all stage")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is reported")
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    args = parser.parse_args()
+
+    # never hit the network or the user's name cache, every lookup is a miss
+    players.configure(players.LookupConfig(cache_dir=None, offline=True))
+
+    with tempfile.TemporaryDirectory() as directory:
+        saves = args.saves or write_saves(Path(directory), args.count, players=args.players,
+                                          advancements=args.advancements, mods=args.mods)
+        timings = {name: best_of(args.repeat, stage) for name, stage in stages(saves, args.jobs).items()}
+
+    if args.json:
+        print(json.dumps({
+            "saves": len(saves),
+            "stages": {name: {"seconds": seconds, "saves_per_second": len(saves) / seconds} for name, seconds in timings.items()}
+        }, indent=2))
+        return
+    print(f"{len(saves)} saves, best of {args.repeat}")
+    print(f"  {'stage':<20} {'total ms':>10} {'us/save':>10} {'saves/s':>12}")
+    for name, seconds in timings.items():
+        print(f"  {name:<20} {seconds * 1000:10.2f} {seconds / len(saves) * 1e6:10.1f} {len(saves) / seconds:12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
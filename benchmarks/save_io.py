@@ -0,0 +1,58 @@
+"""
+compares the ways save folders can be read (savefs.IO_MODES): the time to verify every save with all sections loaded,
+and to stamp them for the result cache, which only lists and stats files
+
+usage: python benchmarks/save_io.py [--count N] [--repeat N] [save ...]
+without saves, count saves of every kind in synthetic.KINDS are generated in a temporary directory. point it at saves on
+the storage you care about (e.g. a network mount), files the page cache already has are cheap to read either way
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import players
+import savefs
+from batch import verify
+from result_cache import stamp
+from synthetic import write_saves
+
+
+def best_of(repeat: int, function: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compares reading saves with each of savefs.IO_MODES")
+    parser.add_argument("saves", type=Path, nargs="*", help="saves to read instead of generated ones")
+    parser.add_argument("--count", type=int, default=20, help="generated saves per kind of level.dat")
+    parser.add_argument("--players", type=int, default=1, help="players per generated save")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per mode, the fastest is reported")
+    args = parser.parse_args()
+
+    players.configure(players.LookupConfig(cache_dir=None, offline=True))
+    with tempfile.TemporaryDirectory() as directory:
+        saves = args.saves or write_saves(Path(directory), args.count, players=args.players)
+        print(f"{len(saves)} saves")
+        print(f"{'mode':<10} {'verify ms':>10} {'saves/s':>9} {'stamp ms':>10}")
+        for mode in savefs.IO_MODES:
+            savefs.configure(mode)
+            verify_time = best_of(args.repeat, lambda: [verify(save) for save in saves])
+            stamp_time = best_of(args.repeat, lambda: [stamp(save) for save in saves])
+            print(f"{mode:<10} {verify_time * 1000:10.2f} {len(saves) / verify_time:9,.0f} {stamp_time * 1000:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
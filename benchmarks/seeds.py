@@ -0,0 +1,56 @@
+"""
+times seed_utils.is_random and is_random_batch against the old fixedint implementation, tests/test_seed_utils.py
+checks that they agree
+
+usage: python benchmarks/seeds.py [--count N] [--number N]
+needs numpy and fixedint
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(2, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+
+import numpy as np
+
+from seed_utils import is_random, is_random_batch, to_int64
+from synthetic import next_long
+# the fixedint implementation, as it was
+from test_seed_utils import is_random as fixedint_is_random
+
+
+def seeds(count: int) -> list[int]:
+    rng = random.Random(0)
+    result = [next_long(rng) for _ in range(count // 2)]
+    result += [to_int64(rng.getrandbits(64)) for _ in range(count // 4)]
+    result += [rng.randrange(-10 ** 6, 10 ** 6) for _ in range(count - len(result))]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="times the ways to check whether seeds could be randomly generated")
+    parser.add_argument("--count", type=int, default=100_000, help="seeds to check")
+    parser.add_argument("--number", type=int, default=3, help="runs per implementation, the average is reported")
+    args = parser.parse_args()
+    count = args.count
+    values = seeds(count)
+    array = np.array(values, dtype=np.int64)
+
+    print(f"{count} seeds, {sum(is_random(seed) for seed in values)} random")
+
+    number = args.number
+    reference_time = timeit.timeit(lambda: [fixedint_is_random(seed) for seed in values], number=number) / number
+    int_time = timeit.timeit(lambda: [is_random(seed) for seed in values], number=number) / number
+    batch_time = timeit.timeit(lambda: is_random_batch(array), number=number) / number
+    print(f"  fixedint:          {count / reference_time:14,.0f} seeds/s")
+    print(f"  is_random:         {count / int_time:14,.0f} seeds/s ({reference_time / int_time:.1f}x)")
+    print(f"  is_random_batch:   {count / batch_time:14,.0f} seeds/s ({reference_time / batch_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+measures the cold start of main.py with python -X importtime: the time spent importing, the slowest top level imports
+and the wall time of the whole run, for verifying a save offline, for -a and for --version
+
+usage: python benchmarks/startup.py [--runs N] [--top N] [--against OTHER_CHECKOUT]
+--against runs the same commands in another checkout (e.g. a git worktree of an older commit) to compare
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import write_save
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def import_times(stderr: str, ignore: set[str]) -> dict[str, int]:
+    """
+    :param ignore: modules imported by the interpreter itself, which main.py doesn't control
+    :return: top level module -> cumulative import time in microseconds
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nested imports are indented under the module that imported them
+        if not name[1:].startswith(" ") and name.strip() not in ignore:
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def interpreter_modules() -> set[str]:
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True).stderr
+    return {line.split("|")[-1].strip() for line in stderr.splitlines() if line.startswith("import time:")}
+
+
+def measure(repo: Path, args: list[str], runs: int, ignore: set[str]) -> tuple[dict[str, int], float]:
+    """
+    :return: the import times of one run, and the fastest wall time of runs runs in seconds
+    """
+    command = [sys.executable, "main.py", *args]
+    stderr = subprocess.run([sys.executable, "-X", "importtime", *command[1:]], cwd=repo, capture_output=True, text=True).stderr
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=repo, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return import_times(stderr, ignore), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="measures how long main.py takes to start")
+    parser.add_argument("--runs", type=int, default=10, help="runs per command, the fastest wall time is reported")
+    parser.add_argument("--top", type=int, default=5, help="how many of the slowest imports to list")
+    parser.add_argument("--against", type=Path, help="another checkout to run the same commands in")
+    args = parser.parse_args()
+
+    ignore = interpreter_modules()
+    with tempfile.TemporaryDirectory() as directory:
+        save = Path(directory, "World")
+        write_save(save, "1.16.1", rng=random.Random(0))
+        advancements_file = next(save.joinpath("advancements").iterdir())
+        commands = {
+            "verify --offline": ["--offline", "--no-cache", str(save)],
+            "-a": ["-a", str(advancements_file)],
+            "--version": ["--version"]
+        }
+        repos = {"this checkout": REPO}
+        if args.against is not None:
+            repos[str(args.against)] = args.against.resolve()
+
+        for name, command in commands.items():
+            print(name)
+            for repo_name, repo in repos.items():
+                times, wall = measure(repo, command, args.runs, ignore)
+                slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:args.top]
+                print(f"  {repo_name}: {wall * 1000:.1f} ms wall, {sum(times.values()) / 1000:.1f} ms importing")
+                print("    " + ", ".join(f"{module} {microseconds / 1000:.1f}" for module, microseconds in slowest))
+
+
+if __name__ == "__main__":
+    main()
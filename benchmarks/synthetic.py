@@ -0,0 +1,285 @@
+"""
+generates synthetic saves for the benchmarks, shaped like the game writes them for each era of level.dat
+
+usage: python benchmarks/synthetic.py OUT [count]
+writes count saves of every kind in KINDS to OUT
+"""
+
+import io
+import json
+import os
+import struct
+import random
+import sys
+import uuid
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nbtlib
+from nbtlib.tag import Byte, Compound, Int, IntArray, List, Long, LongArray, String
+from semver import Version
+
+from advancements import REGISTRY
+from gamerules import ruleset
+from log import show
+from seed_utils import MASK_48, to_int32, to_int64
+
+# version -> how its level.dat is laid out
+# pre-1.13: RandomSeed and a top level DragonFight, 1.13-1.15: DimensionData, 1.16+: WorldGenSettings
+KINDS = {
+    "1.8.9": "legacy",
+    "1.12.2": "legacy",
+    "1.14.4": "dimension_data",
+    "1.15.2": "dimension_data",
+    "1.16.1": "world_gen_settings",
+    "1.16.5": "world_gen_settings"
+}
+
+# the splits of a synthetic run, in order
+SPLITS = ["enter_nether", "enter_bastion", "enter_fortress", "nether_travel", "enter_stronghold", "enter_end"]
+
+DATA_VERSIONS = {"1.8.9": 0, "1.12.2": 1343, "1.14.4": 1976, "1.15.2": 2230, "1.16.1": 2567, "1.16.5": 2586}
+
+
+def inventory(rng: random.Random, items: int) -> List:
+    return List[Compound]([
+        Compound({
+            "id": String(f"minecraft:item_{i}"),
+            "Count": Byte(rng.randrange(1, 64)),
+            "Slot": Byte(i % 36),
+            "tag": Compound({"Enchantments": List[Compound]([Compound({"id": String("minecraft:sharpness"), "lvl": Int(5)})])})
+        })
+        for i in range(items)
+    ])
+
+
+def level_dat(version: str, rng: random.Random, seed: int, items: int = 36, mods: int = 0, name: str = "New World") -> nbtlib.File:
+    """
+    :param items: the number of items in the player's inventory
+    :param mods: the number of mods that store their own data in level.dat
+    """
+    kind = KINDS[version]
+    dragon_fight = Compound({
+        "DragonKilled": Byte(rng.random() < .5),
+        "PreviouslyKilled": Byte(rng.random() < .5),
+        "Gateways": List[Int]([Int(i) for i in range(rng.randrange(16, 21))])
+    })
+    data = Compound({
+        "LevelName": String(name),
+        "Version": Compound({"Name": String(version), "Id": Int(DATA_VERSIONS[version]), "Snapshot": Byte(0)}),
+        "DataVersion": Int(DATA_VERSIONS[version]),
+        "Time": Long(rng.randrange(20 * 60 * 60)),
+        "DayTime": Long(rng.randrange(24000)),
+        "LastPlayed": Long(1700000000000 + rng.randrange(10 ** 9)),
+        "allowCommands": Byte(0),
+        "hardcore": Byte(0),
+        "WasModded": Byte(mods > 0),
+        "Difficulty": Byte(2),
+        "ServerBrands": List[String]([String("fabric" if mods == 0 else "forge")]),
+        "GameRules": Compound({rule.name: String(rule.default_value) for rule in ruleset(Version.parse(version)).values()}),
+        "Player": Compound({"Inventory": inventory(rng, items), "EnderItems": inventory(rng, items // 2), "Health": nbtlib.tag.Float(20)})
+    })
+    if kind == "legacy":
+        data["RandomSeed"] = Long(seed)
+        data["generatorOptions"] = String("")
+        data["MapFeatures"] = Byte(1)
+        data["DragonFight"] = dragon_fight
+    elif kind == "dimension_data":
+        data["RandomSeed"] = Long(seed)
+        data["generatorOptions"] = Compound({})
+        data["MapFeatures"] = Byte(1)
+        data["DimensionData"] = Compound({"1": Compound({"DragonFight": dragon_fight})})
+    else:
+        data["WorldGenSettings"] = Compound({
+            "seed": Long(seed),
+            "bonus_chest": Byte(0),
+            "generate_features": Byte(1),
+            "dimensions": Compound({
+                dimension: Compound({"type": String(dimension), "generator": Compound({"seed": Long(seed), "type": String("minecraft:noise")})})
+                for dimension in ("minecraft:overworld", "minecraft:the_nether", "minecraft:the_end")
+            })
+        })
+        data["DragonFight"] = dragon_fight
+    if kind != "legacy":
+        data["DataPacks"] = Compound({"Enabled": List[String]([String("vanilla")]), "Disabled": List[String]([])})
+    if mods:
+        data["ForgeData"] = Compound({
+            f"examplemod_{i}": Compound({"blob": IntArray([rng.getrandbits(31) for _ in range(256)]), "name": String(f"mod {i}")})
+            for i in range(mods)
+        })
+    return nbtlib.File({"Data": data}, gzipped=True)
+
+
+def advancements_file(rng: random.Random, count: int, recipes: int, criteria: int = 3) -> dict:
+    data = {}
+    for i in range(recipes):
+        data[f"minecraft:recipes/misc/recipe_{i}"] = {
+            "criteria": {f"has_item_{j}": "2023-11-14 22:13:20 +0000" for j in range(criteria)},
+            "done": True
+        }
+    for i in range(count):
+        # real names first, the rest are like a datapack's
+        data[REGISTRY[i] if i < len(REGISTRY) else f"minecraft:story/advancement_{i}"] = {
+            "criteria": {f"criterion_{j}": "2023-11-14 22:13:20 +0000" for j in range(criteria)},
+            "done": rng.random() < .7
+        }
+    data["DataVersion"] = 2586
+    return data
+
+
+def next_long(rng: random.Random) -> int:
+    """
+    new Random().nextLong(), so the seed is one the game could have generated
+    """
+    state = rng.getrandbits(48)
+    state = (state * 0x5deece66d + 0xb) & MASK_48
+    high = to_int32(state >> 16)
+    state = (state * 0x5deece66d + 0xb) & MASK_48
+    low = to_int32(state >> 16)
+    return to_int64((high << 32) + low)
+
+
+def timer_log(rng: random.Random, igt: int, rta: int, pauses: int) -> tuple[list[dict], Iterator[str]]:
+    """
+    a run's splits and the igt_timer.log lines for it, all of the time between igt and rta spent in pauses
+
+    :return: the timelines of record.json, and the log's lines
+    """
+    pauses = max(pauses, 1)
+    # igt stands still while paused, so each pause ends with the rta it started with plus its share of rta - igt
+    paused = [(igt * (k + 1) // (pauses + 1), (rta - igt) * k // pauses, (rta - igt) * (k + 1) // pauses) for k in range(pauses)]
+    splits = []
+    for name, point in zip(SPLITS, sorted(rng.sample(range(1, igt), len(SPLITS)))):
+        # the time paused before this split
+        before = max([end for at, _, end in paused if at < point], default=0)
+        splits.append({"name": name, "igt": point, "rta": point + before})
+
+    def lines() -> Iterator[str]:
+        yield f"SpeedrunIGT timer log, rta {show(rta)}\n"
+        events = [(split["igt"], 0, f"Timeline > {split['name']}, IGT: {show(split['igt'])}, RTA: {show(split['rta'])}") for split in splits]
+        for at, start, end in paused:
+            events.append((at, 1, f"Pause > IGT: {show(at)}, RTA: {show(at + start)}"))
+            events.append((at, 2, f"Resume > IGT: {show(at)}, RTA: {show(at + end)}"))
+        for _, _, line in sorted(events):
+            yield line + "\n"
+        yield f"Result > IGT: {show(igt)}, RTA: {show(rta)}\n"
+
+    return splits, lines()
+
+
+def chunk(rng: random.Random, x: int, z: int, data_version: int, ticks: int, sections: int = 4) -> bytes:
+    """
+    a chunk as it's stored in a region file before 1.18, zlib compressed with its length and compression type in front.
+    the block states are random, so it compresses about as badly as a real one
+    """
+    level = Compound({
+        "xPos": Int(x),
+        "zPos": Int(z),
+        "InhabitedTime": Long(rng.randrange(ticks + 1)),
+        "LastUpdate": Long(ticks),
+        "Status": String("full"),
+        "Sections": List[Compound]([Compound({
+            "Y": Byte(y),
+            "BlockStates": LongArray([to_int64(rng.getrandbits(64)) for _ in range(256)]),
+            "Palette": List[Compound]([Compound({"Name": String("minecraft:stone")}), Compound({"Name": String("minecraft:air")})])
+        }) for y in range(sections)])
+    })
+    buffer = io.BytesIO()
+    buffer.write(b"\x0a\x00\x00")
+    Compound({"DataVersion": Int(data_version), "Level": level}).write(buffer)
+    data = zlib.compress(buffer.getvalue())
+    return struct.pack(">IB", len(data) + 1, 2) + data
+
+
+def write_region(path: Path, region_x: int, region_z: int, rng: random.Random, chunks: int, data_version: int,
+                 ticks: int, saved: tuple[int, int]):
+    """
+    writes an anvil region file with chunks chunks
+
+    :param saved: the range of unix times the chunks were saved at
+    """
+    header = bytearray(2 * 4096)
+    body = bytearray()
+    for i in sorted(rng.sample(range(1024), chunks)):
+        data = chunk(rng, region_x * 32 + i % 32, region_z * 32 + i // 32, data_version, ticks)
+        data += bytes(-len(data) % 4096)
+        struct.pack_into(">I", header, i * 4, (2 + len(body) // 4096) << 8 | len(data) // 4096)
+        struct.pack_into(">I", header, 4096 + i * 4, rng.randrange(*saved))
+        body += data
+    path.write_bytes(header + body)
+
+
+def write_save(folder: Path, version: str, seed: Optional[int] = None, players: int = 1, advancements: int = 40, recipes: int = 300,
+               items: int = 36, mods: int = 0, pauses: int = 0, regions: int = 0, region_chunks: int = 64,
+               rng: Optional[random.Random] = None):
+    """
+    writes a save with a level.dat, stats and advancements for each player and a speedrunigt record
+
+    :param advancements: the number of advancements per player, recipes comes on top of that
+    :param pauses: the pauses in the speedrunigt/logs/igt_timer.log of the run, there's no log if 0
+    :param regions: the overworld region files, region_chunks chunks each
+    """
+    rng = random.Random(0) if rng is None else rng
+    seed = next_long(rng) if seed is None else seed
+    folder.mkdir(parents=True, exist_ok=True)
+    level = level_dat(version, rng, seed, items, mods, folder.name)
+    for folder_name in ("stats", "advancements"):
+        folder.joinpath(folder_name).mkdir(exist_ok=True)
+    for _ in range(players):
+        player = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        folder.joinpath("stats", player + ".json").write_text(json.dumps({"stats": {"minecraft:custom": {"minecraft:play_one_minute": 1}}}))
+        # advancements replaced achievements in 1.12
+        if Version.parse(version) >= Version(1, 12):
+            folder.joinpath("advancements", player + ".json").write_text(json.dumps(advancements_file(rng, advancements, recipes), indent=2))
+    igt = rng.randrange(60_000, 3_600_000)
+    rta = igt + rng.randrange(100_000)
+    # the world ticks through the run and a little past its end, so its ticks agree with the record
+    level["Data"]["Time"] = Long(igt // 50 + rng.randrange(igt // 1000 + 1))
+    level.save(folder.joinpath("level.dat"))
+    splits, lines = timer_log(rng, igt, rta, pauses)
+    folder.joinpath("speedrunigt", "logs").mkdir(parents=True, exist_ok=True)
+    if pauses:
+        with open(folder.joinpath("speedrunigt", "logs", "igt_timer.log"), "w") as log:
+            log.writelines(lines)
+    folder.joinpath("speedrunigt", "record.json").write_text(json.dumps({
+        "speedrunigt_version": "13.3",
+        "category": "ANY",
+        "run_type": "random_seed",
+        "is_completed": True,
+        "date": int(level["Data"]["LastPlayed"]),
+        "retimed_igt": igt,
+        "final_igt": igt + rng.randrange(1000),
+        "final_rta": rta,
+        "timelines": splits
+    }))
+    if regions:
+        folder.joinpath("region").mkdir(exist_ok=True)
+        last_played = int(level["Data"]["LastPlayed"]) // 1000
+        for i in range(regions):
+            # a grid of regions around spawn
+            region_x, region_z = i % 8 - 4, i // 8 - 4
+            write_region(folder.joinpath("region", f"r.{region_x}.{region_z}.mca"), region_x, region_z, rng, region_chunks,
+                         DATA_VERSIONS[version], int(level["Data"]["Time"]), (last_played - rta // 1000, last_played))
+
+
+def write_saves(root: Path, count: int, **kwargs) -> list[Path]:
+    """
+    writes count saves of every kind in KINDS under root
+
+    :param kwargs: passed on to write_save
+    """
+    rng = random.Random(0)
+    saves = []
+    for version in KINDS:
+        for i in range(count):
+            folder = root.joinpath(f"{version} #{i}")
+            write_save(folder, version, rng=rng, **kwargs)
+            saves.append(folder)
+    return saves
+
+
+if __name__ == "__main__":
+    write_saves(Path(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 1)
@@ -0,0 +1,58 @@
+"""
+measures log.check_lines on a long igt_timer.log: lines per second and the peak memory, which stays flat however long
+the log is since it's streamed
+
+usage: python benchmarks/timeline.py [--pauses N] [igt_timer.log ...]
+without logs, one with N pauses is generated in a temporary directory
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+import log
+from synthetic import timer_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="measures checking long igt_timer.log files")
+    parser.add_argument("logs", type=Path, nargs="*", help="logs to check instead of a generated one")
+    parser.add_argument("--pauses", type=int, default=200_000, help="pauses in the generated log, two lines each")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        logs = args.logs
+        if not logs:
+            igt = 3_600_000
+            _, lines = timer_log(random.Random(0), igt, igt + args.pauses * 1000, args.pauses)
+            logs = [Path(directory, "igt_timer.log")]
+            with open(logs[0], "w") as file:
+                file.writelines(lines)
+
+        for path in logs:
+            start = time.perf_counter()
+            with open(path, encoding="utf-8", errors="replace") as lines:
+                timeline = log.check_lines(lines)
+            elapsed = time.perf_counter() - start
+            # again for the memory, tracing allocations slows everything down
+            tracemalloc.start()
+            with open(path, encoding="utf-8", errors="replace") as lines:
+                log.check_lines(lines)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            size = path.stat().st_size
+            print(f"{path.name} ({size / 1e6:.1f} MB, {timeline.events:,} events, {len(timeline.anomalies) + timeline.dropped} anomalies)")
+            print(f"  {elapsed * 1000:10.1f} ms, {timeline.events / elapsed:12,.0f} events/s, {size / 1e6 / elapsed:6.1f} MB/s")
+            print(f"  peak memory: {peak / 1e3:10,.1f} kB")
+
+
+if __name__ == "__main__":
+    main()
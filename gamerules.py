@@ -1,7 +1,14 @@
-from typing import Any, Optional
+import sys
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional, Union
 
 from semver import Version
 
+# (major, minor, patch[, prerelease[, build]]), what gamerules_codegen.py emits so nothing is parsed at import
+VersionTuple = tuple[Union[int, str], ...]
+
 
 class Gamerule:
     """
@@ -9,87 +16,167 @@ class Gamerule:
     have a minimum_version but not necessarily a maximum_version, unversioned gamerules are expected to have neither.
     """
 
+    # every save holds a few dozen of these, and a batch holds every save
+    __slots__ = ("name", "default_value", "minimum_version", "maximum_version")
+
     name: str
     default_value: Any
-    minimum_version: Optional[Version] = None
-    maximum_version: Optional[Version] = None
-
-    def __init__(self, name: str, default_value: Any, minimum: str = None, maximum: str = None):
-        self.name = name
-        self.default_value = default_value
-        if minimum is not None:
-            self.minimum_version = Version.parse(minimum, True)
+    minimum_version: Optional[Version]
+    maximum_version: Optional[Version]
+
+    def __init__(self, name: str, default_value: Any, minimum: Union[VersionTuple, str] = None,
+                 maximum: Union[VersionTuple, str] = None):
+        self.name = sys.intern(name)
+        self.default_value = sys.intern(default_value) if isinstance(default_value, str) else default_value
+        self.minimum_version = None if minimum is None else self.version(minimum)
+        self.maximum_version = None
         if maximum is not None:
             if minimum is None:
                 raise ValueError("improper versioned gamerule")
-            self.maximum_version = Version.parse(maximum, True)
+            self.maximum_version = self.version(maximum)
+
+    @staticmethod
+    def version(version: Union[VersionTuple, str]) -> Version:
+        return Version.parse(version, True) if isinstance(version, str) else Version(*version)
 
     def __str__(self):
         return f"{self.name}: {self.default_value}"
 
 
+@dataclass(slots=True)
+class Deviation:
+    """
+    one way a save's gamerules differ from the defaults for its version
+    """
+    name: str
+    # the value in the save, None if the rule is missing
+    value: Optional[str]
+    # the default value, None if the rule shouldn't exist
+    expected: Optional[str]
+    # "changed", "unexpected" or "missing"
+    problem: str
+
+    def to_dict(self) -> dict[str, Optional[str]]:
+        return {"name": self.name, "value": self.value, "expected": self.expected, "problem": self.problem}
+
+
+@lru_cache(maxsize=4096)
+def save_gamerule(name: str, value: str) -> Gamerule:
+    """
+    a gamerule as set in a save, shared by every save with the same setting (most of them have the defaults) so a
+    batch holds one copy of each setting instead of one per save. don't modify it
+    """
+    return Gamerule(name, value)
+
+
 def gamerules(version: Version) -> list[Gamerule]:
     """
     :param version: the version which the gamerules must be included in
     :return: all gamerules that are compatible with the given version
     """
-    return [rule for rule in rules if rule.minimum_version <= version and
-            (rule.maximum_version >= version if rule.maximum_version is not None else True)]
+    return list(ruleset(version).values())
+
+
+@lru_cache(maxsize=None)
+def ruleset(version: Version) -> dict[str, Gamerule]:
+    """
+    :param version: the version which the gamerules must be included in
+    :return: name -> gamerule for every gamerule compatible with the given version, shared between calls so don't modify it
+    """
+    # versions strictly between two boundaries map to even slots, versions equal to a boundary to odd ones
+    key = precedence(version)
+    i = bisect_left(boundaries, key)
+    exact = i < len(boundaries) and boundaries[i] == key
+    return rulesets[2 * i + exact]
+
+
+def precedence(version: Version) -> tuple:
+    """
+    a key that orders versions the same way semver does, semver's own comparisons (and hashing) are slow enough to
+    dominate importing this module
+    """
+    prerelease = () if version.prerelease is None else tuple(
+        (0, int(part), "") if part.isdigit() else (1, 0, part) for part in version.prerelease.split(".")
+    )
+    # a release comes after all of its prereleases
+    return version.major, version.minor, version.patch, version.prerelease is None, prerelease
+
+
+def build_index() -> tuple[list[tuple], list[dict[str, Gamerule]]]:
+    """
+    splits the version line at every minimum and maximum version, the set of gamerules is the same for every version
+    inside each piece so it only has to be computed once per piece
+
+    :return: the precedence of every boundary, and the rulesets between and at them (see ruleset)
+    """
+    limits = [(precedence(rule.minimum_version), None if rule.maximum_version is None else precedence(rule.maximum_version))
+              for rule in rules]
+    versions = sorted({version for limit in limits for version in limit if version is not None})
+    index = {version: i for i, version in enumerate(versions)}
+    limits = [(index[minimum], len(versions) if maximum is None else index[maximum]) for minimum, maximum in limits]
+    pieces = []
+    for i in range(len(versions) + 1):
+        # between versions[i - 1] and versions[i], then exactly versions[i]
+        pieces.append({rule.name: rule for rule, (minimum, maximum) in zip(rules, limits) if minimum < i <= maximum})
+        pieces.append({rule.name: rule for rule, (minimum, maximum) in zip(rules, limits) if minimum <= i <= maximum})
+    return versions, pieces
 
 
 # source for versions: https://minecraft.wiki/w/Game_rule
 # generated from Fabric Loader, see gamerules_codegen.py and loader_versioning submodule
 rules = [
-    Gamerule("doFireTick", "true", "1.4.0-alpha.12.32.a"),
-    Gamerule("mobGriefing", "true", "1.4.0-alpha.12.32.a"),
-    Gamerule("keepInventory", "false", "1.4.0-alpha.12.32.a"),
-    Gamerule("doMobSpawning", "true", "1.4.0-alpha.12.32.a"),
-    Gamerule("doMobLoot", "true", "1.4.0-alpha.12.32.a"),
-    Gamerule("doTileDrops", "true", "1.4.0-alpha.12.32.a"),
-    Gamerule("commandBlockOutput", "true", "1.4.0-alpha.12.38.a"),
-    Gamerule("naturalRegeneration", "true", "1.6.0-alpha.13.23.a"),
-    Gamerule("doDaylightCycle", "true", "1.6.0-alpha.13.24.a"),
-    Gamerule("logAdminCommands", "true", "1.8.0-alpha.14.3.a"),
-    Gamerule("showDeathMessages", "true", "1.8.0-alpha.14.10.a"),
-    Gamerule("randomTickSpeed", "3", "1.8.0-alpha.14.17.a"),
-    Gamerule("sendCommandFeedback", "true", "1.8.0-alpha.14.26.a"),
-    Gamerule("reducedDebugInfo", "false", "1.8.0-alpha.14.29.a"),
-    Gamerule("doEntityDrops", "true", "1.8.1-rc.1"),
-    Gamerule("spectatorsGenerateChunks", "true", "1.9.0-alpha.15.37.a"),
-    Gamerule("spawnRadius", "10", "1.9.0-alpha.15.51.a"),
-    Gamerule("disableElytraMovementCheck", "false", "1.9.0-alpha.16.7.a"),
-    Gamerule("doWeatherCycle", "true", "1.11.0-alpha.16.38.a"),
-    Gamerule("maxEntityCramming", "24", "1.11.0-alpha.16.38.a"),
-    Gamerule("doLimitedCrafting", "false", "1.12.0-alpha.17.13.a"),
-    Gamerule("maxCommandChainLength", "65536", "1.12.0-alpha.17.16.b"),
-    Gamerule("announceAdvancements", "true", "1.12.0-alpha.17.18.a"),
-    Gamerule("gameLoopFunction", "-", "1.12.0-rc.1", "1.13.0-alpha.17.49.a"),
-    Gamerule("disableRaids", "false", "1.14.3-rc.3"),
-    Gamerule("doInsomnia", "true", "1.15.0-alpha.19.36.a"),
-    Gamerule("doImmediateRespawn", "false", "1.15.0-alpha.19.36.a"),
-    Gamerule("drowningDamage", "true", "1.15.0-alpha.19.36.a"),
-    Gamerule("fallDamage", "true", "1.15.0-alpha.19.36.a"),
-    Gamerule("fireDamage", "true", "1.15.0-alpha.19.36.a"),
-    Gamerule("doPatrolSpawning", "true", "1.15.2-rc.1"),
-    Gamerule("doTraderSpawning", "true", "1.15.2-rc.1"),
-    Gamerule("universalAnger", "false", "1.16.0-rc.1"),
-    Gamerule("forgiveDeadPlayers", "true", "1.16.0-rc.1"),
-    Gamerule("freezeDamage", "true", "1.17.0-alpha.20.48.a"),
-    Gamerule("playersSleepingPercentage", "100", "1.17.0-alpha.20.51.a"),
-    Gamerule("doWardenSpawning", "true", "1.19.0-alpha.22.16.a"),
-    Gamerule("blockExplosionDropDecay", "true", "1.19.3-alpha.22.44.a"),
-    Gamerule("mobExplosionDropDecay", "true", "1.19.3-alpha.22.44.a"),
-    Gamerule("tntExplosionDropDecay", "false", "1.19.3-alpha.22.44.a"),
-    Gamerule("snowAccumulationHeight", "1", "1.19.3-alpha.22.44.a"),
-    Gamerule("waterSourceConversion", "true", "1.19.3-alpha.22.44.a"),
-    Gamerule("lavaSourceConversion", "false", "1.19.3-alpha.22.44.a"),
-    Gamerule("globalSoundEvents", "true", "1.19.3-alpha.22.44.a"),
-    Gamerule("commandModificationBlockLimit", "32768", "1.19.4-alpha.23.3.a"),
-    Gamerule("doVinesSpread", "true", "1.19.4-alpha.23.6.a"),
-    Gamerule("enderPearlsVanishOnDeath", "true", "1.20.2-beta.1"),
-    Gamerule("maxCommandForkCount", "65536", "1.20.3-alpha.23.41.a"),
-    Gamerule("projectilesCanBreakBlocks", "true", "1.20.3-alpha.23.42.a"),
-    Gamerule("playersNetherPortalDefaultDelay", "80", "1.20.3-alpha.23.42.a"),
-    Gamerule("playersNetherPortalCreativeDelay", "1", "1.20.3-alpha.23.42.a"),
-    Gamerule("spawnChunkRadius", "2", "1.20.5-alpha.24.3.a")
+    Gamerule("doFireTick", "true", (1, 4, 0, "alpha.12.32.a")),
+    Gamerule("mobGriefing", "true", (1, 4, 0, "alpha.12.32.a")),
+    Gamerule("keepInventory", "false", (1, 4, 0, "alpha.12.32.a")),
+    Gamerule("doMobSpawning", "true", (1, 4, 0, "alpha.12.32.a")),
+    Gamerule("doMobLoot", "true", (1, 4, 0, "alpha.12.32.a")),
+    Gamerule("doTileDrops", "true", (1, 4, 0, "alpha.12.32.a")),
+    Gamerule("commandBlockOutput", "true", (1, 4, 0, "alpha.12.38.a")),
+    Gamerule("naturalRegeneration", "true", (1, 6, 0, "alpha.13.23.a")),
+    Gamerule("doDaylightCycle", "true", (1, 6, 0, "alpha.13.24.a")),
+    Gamerule("logAdminCommands", "true", (1, 8, 0, "alpha.14.3.a")),
+    Gamerule("showDeathMessages", "true", (1, 8, 0, "alpha.14.10.a")),
+    Gamerule("randomTickSpeed", "3", (1, 8, 0, "alpha.14.17.a")),
+    Gamerule("sendCommandFeedback", "true", (1, 8, 0, "alpha.14.26.a")),
+    Gamerule("reducedDebugInfo", "false", (1, 8, 0, "alpha.14.29.a")),
+    Gamerule("doEntityDrops", "true", (1, 8, 1, "rc.1")),
+    Gamerule("spectatorsGenerateChunks", "true", (1, 9, 0, "alpha.15.37.a")),
+    Gamerule("spawnRadius", "10", (1, 9, 0, "alpha.15.51.a")),
+    Gamerule("disableElytraMovementCheck", "false", (1, 9, 0, "alpha.16.7.a")),
+    Gamerule("doWeatherCycle", "true", (1, 11, 0, "alpha.16.38.a")),
+    Gamerule("maxEntityCramming", "24", (1, 11, 0, "alpha.16.38.a")),
+    Gamerule("doLimitedCrafting", "false", (1, 12, 0, "alpha.17.13.a")),
+    Gamerule("maxCommandChainLength", "65536", (1, 12, 0, "alpha.17.16.b")),
+    Gamerule("announceAdvancements", "true", (1, 12, 0, "alpha.17.18.a")),
+    Gamerule("gameLoopFunction", "-", (1, 12, 0, "rc.1"), (1, 13, 0, "alpha.17.49.a")),
+    Gamerule("disableRaids", "false", (1, 14, 3, "rc.3")),
+    Gamerule("doInsomnia", "true", (1, 15, 0, "alpha.19.36.a")),
+    Gamerule("doImmediateRespawn", "false", (1, 15, 0, "alpha.19.36.a")),
+    Gamerule("drowningDamage", "true", (1, 15, 0, "alpha.19.36.a")),
+    Gamerule("fallDamage", "true", (1, 15, 0, "alpha.19.36.a")),
+    Gamerule("fireDamage", "true", (1, 15, 0, "alpha.19.36.a")),
+    Gamerule("doPatrolSpawning", "true", (1, 15, 2, "rc.1")),
+    Gamerule("doTraderSpawning", "true", (1, 15, 2, "rc.1")),
+    Gamerule("universalAnger", "false", (1, 16, 0, "rc.1")),
+    Gamerule("forgiveDeadPlayers", "true", (1, 16, 0, "rc.1")),
+    Gamerule("freezeDamage", "true", (1, 17, 0, "alpha.20.48.a")),
+    Gamerule("playersSleepingPercentage", "100", (1, 17, 0, "alpha.20.51.a")),
+    Gamerule("doWardenSpawning", "true", (1, 19, 0, "alpha.22.16.a")),
+    Gamerule("blockExplosionDropDecay", "true", (1, 19, 3, "alpha.22.44.a")),
+    Gamerule("mobExplosionDropDecay", "true", (1, 19, 3, "alpha.22.44.a")),
+    Gamerule("tntExplosionDropDecay", "false", (1, 19, 3, "alpha.22.44.a")),
+    Gamerule("snowAccumulationHeight", "1", (1, 19, 3, "alpha.22.44.a")),
+    Gamerule("waterSourceConversion", "true", (1, 19, 3, "alpha.22.44.a")),
+    Gamerule("lavaSourceConversion", "false", (1, 19, 3, "alpha.22.44.a")),
+    Gamerule("globalSoundEvents", "true", (1, 19, 3, "alpha.22.44.a")),
+    Gamerule("commandModificationBlockLimit", "32768", (1, 19, 4, "alpha.23.3.a")),
+    Gamerule("doVinesSpread", "true", (1, 19, 4, "alpha.23.6.a")),
+    Gamerule("enderPearlsVanishOnDeath", "true", (1, 20, 2, "beta.1")),
+    Gamerule("maxCommandForkCount", "65536", (1, 20, 3, "alpha.23.41.a")),
+    Gamerule("projectilesCanBreakBlocks", "true", (1, 20, 3, "alpha.23.42.a")),
+    Gamerule("playersNetherPortalDefaultDelay", "80", (1, 20, 3, "alpha.23.42.a")),
+    Gamerule("playersNetherPortalCreativeDelay", "1", (1, 20, 3, "alpha.23.42.a")),
+    Gamerule("spawnChunkRadius", "2", (1, 20, 5, "alpha.24.3.a"))
 ]
+
+boundaries, rulesets = build_index()
@@ -1,3 +1,4 @@
+import json
 import os.path
 from dataclasses import dataclass
 from subprocess import Popen, DEVNULL
@@ -99,6 +100,14 @@ finally:
     # if the process isn't killed, bad things happen
     process.kill()
 
+
+def version_tuple(version: Version) -> str:
+    # gamerules.py builds the Version straight from this, parsing the string form at import is measurably slow
+    parts = list(version.to_tuple())
+    while parts[-1] is None:
+        parts.pop()
+    return f"({', '.join(json.dumps(part) if isinstance(part, str) else str(part) for part in parts)})"
+
+
 for rule in rules:
-    quote = "\""
-    print(f'Gamerule("{rule.name}", "{rule.default_value}", "{str(rule.minimum_version)}"{", " + quote + str(rule.maximum_version) + quote if rule.maximum_version is not None else ""}),')
+    print(f'Gamerule("{rule.name}", "{rule.default_value}", {version_tuple(rule.minimum_version)}{", " + version_tuple(rule.maximum_version) if rule.maximum_version is not None else ""}),')
@@ -1,7 +1,254 @@
-from pathlib import Path
+import io
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional
 
+import profiling
+from savefs import SaveFS
+from util import normalize_time
 
-def parse_log(log: Path):
-    with open(log) as l:
-        for e in l:
-            
\ No newline at end of file
+if TYPE_CHECKING:
+    from SpeedrunIGTInfo import SpeedrunIGTInfo
+
+# SpeedrunIGT's timer log, relative to the save
+LOG = "speedrunigt/logs/igt_timer.log"
+
+# how far apart two times that should be the same can be, the log and record.json round differently
+TOLERANCE_MS = 100
+# how much longer igt can be than the world's ticks add up to before it's an anomaly. lag makes igt longer than the
+# ticks (the server runs under 20 tps), but only by so much. igt shorter than the ticks is normal, the world keeps
+# ticking after the run ends
+TICK_SLACK = 0.2
+# anomalies kept per save, a broken log could otherwise have one on every line
+MAX_ANOMALIES = 50
+
+
+@dataclass(slots=True)
+class Event:
+    """
+    one line of igt_timer.log: "<kind> > <name>, IGT: <time>, RTA: <time>", the name only on timeline lines and
+    optionally after a "[time] " prefix. e.g. "Timeline > enter_nether, IGT: 5:12.345, RTA: 5:40.120"
+
+    a line with a time that can't be read is an "unreadable" event named after that time
+    """
+    kind: str
+    line: int
+    name: Optional[str] = None
+    igt: Optional[int] = None
+    rta: Optional[int] = None
+
+
+def parse_time(text: str) -> int:
+    """
+    :param text: [[h:]m:]s[.mmm] as the log prints it, or milliseconds
+    :return: milliseconds
+    """
+    if ":" not in text and "." not in text:
+        return int(text)
+    seconds = 0.0
+    for part in text.split(":"):
+        seconds = seconds * 60 + float(part)
+    return round(seconds * 1000)
+
+
+def parse_log(lines: Iterable[str]) -> Iterator[Event]:
+    """
+    reads a log one line at a time, lines that aren't events (the mod's other output) are skipped
+
+    :param lines: the log, e.g. an open file, which is never read into memory as a whole
+    """
+    for number, line in enumerate(lines, 1):
+        kind, separator, rest = line.partition(" > ")
+        if not separator:
+            continue
+        if kind.startswith("["):
+            kind = kind[kind.find("]") + 1:]
+        event = Event(kind.strip().lower(), number)
+        for part in rest.rstrip("\r\n").split(", "):
+            key, separator, value = part.partition(": ")
+            if not separator:
+                event.name = part.strip()
+                continue
+            try:
+                match key.strip().lower():
+                    case "igt":
+                        event.igt = parse_time(value.strip())
+                    case "rta":
+                        event.rta = parse_time(value.strip())
+            except ValueError:
+                event = Event("unreadable", number, value.strip())
+                break
+        yield event
+
+
+def show(ms: int) -> str:
+    sign, ms = ("-" if ms < 0 else ""), abs(ms)
+    return sign + normalize_time(f"{ms // 3_600_000}:{ms // 60_000 % 60:02}:{ms // 1000 % 60:02}.{ms % 1000:03}000")
+
+
+@dataclass(slots=True)
+class Timeline:
+    """
+    the checks on a run's timeline, fed one log event at a time (see add) and finished with record.json and level.dat
+    """
+    # whether there was an igt_timer.log to read
+    log: bool = False
+    events: int = 0
+    # name, igt and rta of every split, from the log or record.json if there's no log
+    splits: list[tuple[str, int, int]] = field(default_factory=list)
+    pauses: int = 0
+    paused_ms: int = 0
+    # the igt and rta of the log's result line
+    result: Optional[tuple[int, int]] = None
+    anomalies: list[str] = field(default_factory=list)
+    # anomalies found beyond MAX_ANOMALIES
+    dropped: int = 0
+    last_igt: int = 0
+    last_rta: int = 0
+    pause: Optional[Event] = None
+
+    def anomaly(self, text: str):
+        if len(self.anomalies) < MAX_ANOMALIES:
+            self.anomalies.append(text)
+        else:
+            self.dropped += 1
+
+    def add(self, event: Event):
+        self.events += 1
+        where = f"line {event.line}"
+        if event.igt is not None:
+            if event.igt < self.last_igt - TOLERANCE_MS:
+                self.anomaly(f"{where}: igt goes back from {show(self.last_igt)} to {show(event.igt)}")
+            self.last_igt = max(self.last_igt, event.igt)
+        if event.rta is not None:
+            if event.rta < self.last_rta - TOLERANCE_MS:
+                self.anomaly(f"{where}: rta goes back from {show(self.last_rta)} to {show(event.rta)}")
+            self.last_rta = max(self.last_rta, event.rta)
+            if event.igt is not None and event.igt > event.rta + TOLERANCE_MS:
+                self.anomaly(f"{where}: igt {show(event.igt)} is ahead of rta {show(event.rta)}")
+        match event.kind:
+            case "unreadable":
+                self.anomaly(f"{where}: can't read the time {event.name}")
+            case "timeline" | "split":
+                if event.igt is None or event.rta is None:
+                    self.anomaly(f"{where}: split {event.name} has no igt or rta")
+                else:
+                    self.splits.append((event.name or "unnamed", event.igt, event.rta))
+            case "pause":
+                if self.pause is not None:
+                    self.anomaly(f"{where}: paused again without resuming since line {self.pause.line}")
+                self.pause = event
+            case "resume":
+                if self.pause is None:
+                    self.anomaly(f"{where}: resumed without pausing")
+                else:
+                    self.pauses += 1
+                    if event.rta is not None and self.pause.rta is not None:
+                        self.paused_ms += event.rta - self.pause.rta
+                    if event.igt is not None and self.pause.igt is not None and event.igt - self.pause.igt > TOLERANCE_MS:
+                        self.anomaly(f"{where}: igt went on for {show(event.igt - self.pause.igt)} while paused "
+                                     f"since line {self.pause.line}")
+                    self.pause = None
+            case "result":
+                if event.igt is None or event.rta is None:
+                    self.anomaly(f"{where}: result has no igt or rta")
+                else:
+                    if self.result is not None:
+                        self.anomaly(f"{where}: more than one result")
+                    self.result = (event.igt, event.rta)
+
+    def finish(self, record: "SpeedrunIGTInfo", ticks: Optional[int]):
+        """
+        checks the log against record.json and the world's ticks, and record.json against itself
+
+        :param record: the save's speedrunigt record
+        :param ticks: Time in level.dat
+        """
+        igt, final_igt, rta = record.igt_ms, record.final_igt_ms, record.rta_ms
+        timelines = []
+        for name, split_igt, split_rta in record.timelines:
+            if split_igt is None or split_rta is None:
+                self.anomaly(f"split {name} in record.json has no igt or rta")
+            else:
+                timelines.append((name, split_igt, split_rta))
+        if self.log:
+            if self.result is not None:
+                result_igt, result_rta = self.result
+                if igt is not None and all(abs(result_igt - ms) > TOLERANCE_MS for ms in (igt, final_igt) if ms is not None):
+                    self.anomaly(f"the log's result igt {show(result_igt)} isn't the record's {show(igt)}")
+                if rta is not None and abs(result_rta - rta) > TOLERANCE_MS:
+                    self.anomaly(f"the log's result rta {show(result_rta)} isn't the record's {show(rta)}")
+            logged = {name: (split_igt, split_rta) for name, split_igt, split_rta in self.splits}
+            for name, split_igt, split_rta in timelines:
+                if name not in logged:
+                    self.anomaly(f"split {name} is in record.json but not the log")
+                elif abs(logged[name][0] - split_igt) > TOLERANCE_MS or abs(logged[name][1] - split_rta) > TOLERANCE_MS:
+                    self.anomaly(f"split {name} is at {show(split_igt)} in record.json but {show(logged[name][0])} in the log")
+        else:
+            previous = 0
+            for name, split_igt, split_rta in timelines:
+                if split_igt < previous - TOLERANCE_MS:
+                    self.anomaly(f"split {name} at {show(split_igt)} is before the one before it")
+                if split_igt > split_rta + TOLERANCE_MS:
+                    self.anomaly(f"split {name} igt {show(split_igt)} is ahead of its rta {show(split_rta)}")
+                previous = split_igt
+            self.splits = timelines
+        if igt is None or rta is None:
+            self.anomaly("record.json has no retimed igt or final rta")
+            return
+        if igt > rta + TOLERANCE_MS:
+            self.anomaly(f"igt {show(igt)} is longer than rta {show(rta)}")
+        for name, split_igt, split_rta in self.splits:
+            if split_igt > (final_igt or igt) + TOLERANCE_MS or split_rta > rta + TOLERANCE_MS:
+                self.anomaly(f"split {name} at {show(split_igt)} is after the end of the run")
+        if self.paused_ms > rta - igt + TOLERANCE_MS:
+            self.anomaly(f"{show(self.paused_ms)} paused, but rta is only {show(rta - igt)} longer than igt")
+        if ticks and igt > ticks * 50 * (1 + TICK_SLACK):
+            self.anomaly(f"igt {show(igt)} is {igt / (ticks * 50) - 1:.0%} longer than the world's {ticks} ticks")
+
+    def render(self) -> str:
+        source = f"{self.events} log events" if self.log else "no igt_timer.log, record.json only"
+        lines = [f"timeline: {len(self.splits)} splits, {self.pauses} pauses ({show(self.paused_ms)}), {source}, "
+                 f"{len(self.anomalies) + self.dropped or 'no'} anomalies\n"]
+        lines.extend(f"  {anomaly}\n" for anomaly in self.anomalies)
+        if self.dropped:
+            lines.append(f"  and {self.dropped} more\n")
+        return "".join(lines)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "log": self.log,
+            "events": self.events,
+            "splits": [{"name": name, "igt_ms": igt, "rta_ms": rta} for name, igt, rta in self.splits],
+            "pauses": self.pauses,
+            "paused_ms": self.paused_ms,
+            "anomalies": self.anomalies,
+            "dropped_anomalies": self.dropped
+        }
+
+
+def check_lines(lines: Iterable[str], timeline: Optional[Timeline] = None) -> Timeline:
+    """
+    feeds every event of a log to a timeline
+    """
+    timeline = Timeline() if timeline is None else timeline
+    timeline.log = True
+    for event in parse_log(lines):
+        timeline.add(event)
+    return timeline
+
+
+def check(fs: SaveFS, record: "SpeedrunIGTInfo", ticks: Optional[int]) -> Timeline:
+    """
+    verifies the timeline of a save's run, streaming its igt_timer.log if it has one
+
+    :param fs: the save
+    :param record: the save's speedrunigt record
+    :param ticks: Time in level.dat
+    """
+    with profiling.span("timeline"):
+        timeline = Timeline()
+        if fs.exists(LOG):
+            with fs.open(LOG) as raw, io.TextIOWrapper(raw, encoding="utf-8", errors="replace") as lines:
+                check_lines(lines, timeline)
+        timeline.finish(record, ticks)
+        return timeline
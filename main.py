@@ -3,9 +3,29 @@
 import argparse
 import json
 import os
+import sys
+from datetime import datetime
+from itertools import chain
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
+import advancements
+import log
+import players
+import profiling
+import report
+import savefs
+from batch import Result, make_executor, verify_all
+from result_cache import ResultCache
 from save import WorldSave
+from savefs import archive_has_save, is_archive
+from scan import scan_saves
+from util import default_cache_dir
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+    import region
 
 version = "1.0.0"
 verbose = False
@@ -14,10 +34,31 @@ verbose = False
 def is_save_folder(path: str) -> Path:
     if (os.path.isdir(path) and os.path.exists(os.path.join(path, "level.dat"))) or (os.path.isfile(path) and path.endswith(".json")):
         return Path(path)
+    elif os.path.isfile(path) and is_archive(Path(path)) and archive_has_save(Path(path)):
+        return Path(path)
     else:
         raise argparse.ArgumentTypeError(f"{path} does not contain a level.dat file")
 
 
+def parse_fields(fields: str) -> list[str]:
+    fields = [field.strip() for field in fields.split(",") if field.strip()]
+    for field in fields:
+        if field not in WorldSave.FIELDS:
+            raise argparse.ArgumentTypeError(f"unknown field {field}, must be one of {', '.join(WorldSave.FIELDS)}")
+    return fields
+
+
+def parse_time(time: str) -> float:
+    try:
+        return float(time)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(time).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{time} is not an iso format time or unix time")
+
+
 def main():
     global verbose
     parser = argparse.ArgumentParser(
@@ -25,27 +66,193 @@ def main():
         description="Verifies save files for MCSR",
         epilog="By tildejustin, based off of SavesFolderReader by DuncanRuns"
     )
-    parser.add_argument("save_folder", metavar="F", nargs="+", type=is_save_folder, default=os.curdir, help="the folder(s) to check")
-    parser.add_argument("-l", "--log", )
+    parser.add_argument("save_folder", metavar="F", nargs="*", type=is_save_folder, help="the folder(s) or archives of them to check")
+    parser.add_argument("--scan", metavar="DIR", action="append", type=Path, default=[], help="also check every save found anywhere under this folder")
+    parser.add_argument("--newest", metavar="N", type=int, help="with --scan, only check the N most recently played saves of each folder")
+    parser.add_argument("--since", type=parse_time, help="with --scan, only check saves played at or after this time (iso format or unix time)")
+    parser.add_argument("--name", metavar="GLOB", help="with --scan, only check saves whose folder name matches this glob")
+    parser.add_argument("--archives", action="store_true", help="with --scan, also check zip and tar archives of saves")
+    parser.add_argument("--watch", metavar="DIR", type=Path, help="keep running and check saves under this folder as they're created or changed")
+    parser.add_argument("--debounce", type=float, default=2.0, help="with --watch, how many seconds level.dat and speedrunigt/record.json must stay unchanged before a save is checked")
+    parser.add_argument("--poll", action="store_true", help="with --watch, rescan the folder instead of using inotify")
+    parser.add_argument("--serve", metavar="ADDRESS", nargs="?", const="", help="keep running and verify saves sent over http, ADDRESS is a port, host:port or the path of a unix socket (server.DEFAULT_PORT on localhost if left out). see server.Handler for the api")
+    parser.add_argument("-l", "--log", metavar="FILE", type=Path, help="checks a speedrunigt igt_timer.log on its own (splits, pauses and times going backwards) and prints its timeline. with --format ndjson it's printed as json")
     parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {version}")
     parser.add_argument("-ver", "--verbose", action="store_true")
     parser.add_argument("-a", "--advancements", action="store_true", help="prints the number of advancements. if -v it also prints the names. takes an advancements file.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="the number of worker processes to verify saves with")
+    parser.add_argument("--order", choices=["input", "completion"], default="input", help="the order to print results in when using multiple jobs")
+    parser.add_argument("--format", choices=["text", "ndjson"], default="text", help="print each save as text or as one json object per line")
+    parser.add_argument("--fields", type=parse_fields, help=f"comma separated sections to print, any of {', '.join(WorldSave.FIELDS)}. only what's needed for them is read")
+    parser.add_argument("--report", metavar="FILE", type=Path, help="after the batch, check the saves against each other (duplicate seeds, players in more than one save, igt/ticks outliers), print a summary and write a table of every save to FILE, as parquet (needs pyarrow) if it ends in .parquet and csv otherwise")
+    parser.add_argument("--regions", action="store_true", help="also scan the region files of each save folder for chunks that don't fit the save: saved by another version, inhabited or updated for longer than the world has run, saved before the run started or after it was last played, or stored at the wrong position. uses the -j worker processes")
+    parser.add_argument("--region-chunks", metavar="N", type=int, help="with --regions, only decompress N chunks of each region file (and those whose save times stand out), the headers of every chunk are always checked")
+    parser.add_argument("--io", choices=savefs.IO_MODES, default="read", help="how save folders are read: read opens and reads each file on its own, mapped lists each folder once and reads files into a reused buffer or mmaps them, for saves on network storage")
+    parser.add_argument("--offline", action="store_true", help="only read player names from the cache, never from the network")
+    parser.add_argument("--cache-dir", type=Path, default=default_cache_dir(), help="where to cache player names and verified saves")
+    parser.add_argument("--no-cache", action="store_true", help="don't cache anything on disk")
+    parser.add_argument("--reverify", action="store_true", help="verify every save again instead of using stored results for unchanged ones")
+    parser.add_argument("--cache-ttl", type=float, default=players.LookupConfig.ttl, help="seconds before a cached player name is looked up again")
+    parser.add_argument("--negative-ttl", type=float, default=players.LookupConfig.negative_ttl, help="seconds before a uuid without a profile is looked up again")
+    parser.add_argument("--lookup-concurrency", type=int, default=players.DEFAULT_CONCURRENCY, help="the maximum number of player lookups in flight at once")
+    parser.add_argument("--profile-url", default=players.PROFILE_URL, help="the profile lookup endpoint, the uuid is appended to it")
+    parser.add_argument("--profile", action="store_true", help="print how long each stage took (count, total, p50, p95) to stderr at the end")
+    parser.add_argument("--trace", metavar="FILE", type=Path, help="write every timed stage, including those in worker processes, as a chrome trace")
+    parser.add_argument("--pstats", metavar="FILE", type=Path, help="profile this process with cProfile and write the stats (workers from -j aren't included)")
     args = parser.parse_args()
+    if not args.save_folder and not args.scan and args.watch is None and args.serve is None and args.log is None:
+        parser.error("no saves given, pass save folders, --scan, --watch or --serve")
     verbose = args.verbose
     advancements_only = args.advancements
 
-    for save_folder in args.save_folder:
-        if advancements_only:
-            with open(save_folder) as f:
-                advancements = list(filter(lambda s: not s.startswith("minecraft:recipe") and "/" in s, json.load(f)))
-                if verbose:
-                    for advancement in advancements:
-                        print(advancement.replace("minecraft:", ""))
-                print(len(advancements))
-            continue
-        save = WorldSave(save_folder)
-        text = str(save)
-        print(text)
+    if advancements_only:
+        for save_folder in args.save_folder:
+            names = advancements.parse(save_folder.read_bytes(), done_only=False)
+            if verbose:
+                for name in names:
+                    print(name.replace("minecraft:", ""))
+            print(len(names))
+        return
+
+    if args.log is not None:
+        with open(args.log, encoding="utf-8", errors="replace") as lines:
+            timeline = log.check_lines(lines)
+        if args.format == "ndjson":
+            print(json.dumps(timeline.to_dict()))
+        else:
+            print(timeline.render(), end="")
+        return
+
+    players.configure(players.LookupConfig(
+        cache_dir=None if args.no_cache else args.cache_dir,
+        ttl=args.cache_ttl,
+        negative_ttl=args.negative_ttl,
+        offline=args.offline,
+        url=args.profile_url
+    ))
+    savefs.configure(args.io)
+    if args.profile or args.trace is not None:
+        profiling.enable()
+    profiler = None
+    if args.pstats is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    results = None
+    if not args.no_cache:
+        results = ResultCache(args.cache_dir, not args.reverify)
+    failed = False
+    save_folders = chain(args.save_folder, *(scan_saves(root, args.name, args.since, args.newest, archives=args.archives) for root in args.scan))
+    load_fields = args.fields
+    batch_report = None
+    if args.report is not None:
+        batch_report = report.Report()
+        if args.fields is not None:
+            # the report needs its sections whatever is printed
+            load_fields = [field for field in WorldSave.FIELDS if field in args.fields or field in report.FIELDS]
+    executor = None
+    if args.regions:
+        # the same workers verify the saves and scan their region files
+        executor = make_executor(args.jobs) if args.jobs > 1 else None
+    for save_folder, save in verify_all(save_folders, args.jobs, args.order == "input", load_fields, args.lookup_concurrency, results, executor=executor):
+        region_scan = None
+        if args.regions:
+            save, region_scan = scan_regions(save_folder, save, executor, args.region_chunks)
+        with profiling.span("output"):
+            save = print_result(save_folder, save, args.format, args.fields, region_scan)
+        failed |= isinstance(save, Exception)
+        if batch_report is not None:
+            try:
+                batch_report.add(save_folder, save)
+            except Exception as e:
+                batch_report.add(save_folder, e)
+    if batch_report is not None:
+        with profiling.span("report"):
+            print_report(batch_report, args.report, args.format)
+
+    if args.watch is not None:
+        from watch import watch
+        try:
+            for save_folder in watch(args.watch, args.debounce, poll=args.poll):
+                for _, save in verify_all([save_folder], fields=args.fields, lookup_concurrency=args.lookup_concurrency, results=results):
+                    region_scan = None
+                    if args.regions:
+                        save, region_scan = scan_regions(save_folder, save, executor, args.region_chunks)
+                    print_result(save_folder, save, args.format, args.fields, region_scan)
+        except KeyboardInterrupt:
+            pass
+    if args.serve is not None:
+        # http.server is only needed here
+        from server import Verifier, serve
+        serve(args.serve, Verifier(args.jobs, args.fields, args.lookup_concurrency, results))
+    if executor is not None:
+        executor.shutdown()
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.pstats)
+    if args.profile:
+        print(profiling.summary(), file=sys.stderr)
+    if args.trace is not None:
+        profiling.write_trace(args.trace)
+    if failed:
+        sys.exit(1)
+
+
+def print_report(batch_report: report.Report, path: Path, output_format: str):
+    try:
+        batch_report.write(path)
+    except ImportError as e:
+        print(f"could not write {path}: {e}, install pyarrow or write csv instead", file=sys.stderr)
+    if output_format == "ndjson":
+        print(json.dumps({"report": batch_report.summary()}), flush=True)
+    else:
+        print(batch_report.render(), flush=True)
+
+
+def scan_regions(save_folder: Path, save: Result, executor: Optional["ProcessPoolExecutor"],
+                 chunk_limit: Optional[int]) -> tuple[Result, Optional["region.RegionScan"]]:
+    """
+    :param chunk_limit: passed on to region.scan_save
+    :return: the save, or why its region files couldn't be scanned, and its region files if they were
+    """
+    # region.py is only needed here
+    import region
+    if isinstance(save, Exception):
+        return save, None
+    try:
+        return save, region.scan_save(save_folder, save, executor, chunk_limit)
+    except Exception as e:
+        return e, None
+
+
+def print_result(save_folder: Path, save: Result, output_format: str, fields: Optional[list[str]],
+                 region_scan: Optional["region.RegionScan"] = None) -> Result:
+    """
+    :param region_scan: the save's region files, printed after it if they were scanned
+    :return: the save, or why it couldn't be verified or printed
+    """
+    if not isinstance(save, Exception):
+        # sections can still be read here and fail like any other part of the save, nothing is printed until they're in
+        try:
+            if output_format == "ndjson":
+                result = save.to_dict(fields)
+                if region_scan is not None:
+                    result["region"] = region_scan.to_dict()
+                text = json.dumps(result)
+            else:
+                text = save.render(fields)
+                if region_scan is not None:
+                    text = text.rstrip("\n") + "\n" + region_scan.render()
+        except Exception as e:
+            save = e
+    if isinstance(save, Exception):
+        print(f"{save_folder}: could not verify save: {save!r}", file=sys.stderr)
+        if output_format == "ndjson":
+            print(json.dumps({"path": str(save_folder), "error": repr(save)}), flush=True)
+        return save
+    print(text, flush=True)
+    return save
 
 
 if __name__ == "__main__":
@@ -0,0 +1,143 @@
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Optional, Union
+
+# tag ids, see https://minecraft.wiki/w/NBT_format
+END, BYTE, SHORT, INT, LONG, FLOAT, DOUBLE, BYTE_ARRAY, STRING, LIST, COMPOUND, INT_ARRAY, LONG_ARRAY = range(13)
+
+# payload sizes of the tags that have one
+FIXED_SIZES = {BYTE: 1, SHORT: 2, INT: 4, LONG: 8, FLOAT: 4, DOUBLE: 8}
+ARRAY_SIZES = {BYTE_ARRAY: 1, INT_ARRAY: 4, LONG_ARRAY: 8}
+FORMATS = {BYTE: ">b", SHORT: ">h", INT: ">i", LONG: ">q", FLOAT: ">f", DOUBLE: ">d"}
+ARRAY_FORMATS = {BYTE_ARRAY: "b", INT_ARRAY: "i", LONG_ARRAY: "q"}
+
+# which parts of a compound to read: True reads the whole value, a nested Spec reads only those keys of a compound
+Spec = dict[str, Union[bool, "Spec"]]
+
+
+class NBTReader:
+    """
+    walks an uncompressed big-endian nbt tag stream, only materializing the values a spec asks for and skipping over
+    the payloads of everything else without building objects for them
+    """
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def read_root(self, spec: Spec) -> dict[str, Any]:
+        tag_type = self.data[self.pos]
+        self.pos += 1
+        if tag_type != COMPOUND:
+            raise ValueError(f"root tag must be a compound, not {tag_type}")
+        self.skip_string()
+        return self.read_compound(spec)
+
+    def read_string(self) -> str:
+        (length,) = struct.unpack_from(">H", self.data, self.pos)
+        self.pos += 2 + length
+        # nbt strings are modified utf-8, which only differs from utf-8 for null and supplementary characters
+        return bytes(self.data[self.pos - length:self.pos]).decode("utf-8", errors="replace")
+
+    def skip_string(self):
+        (length,) = struct.unpack_from(">H", self.data, self.pos)
+        self.pos += 2 + length
+
+    def read_compound(self, spec: Optional[Spec] = None) -> dict[str, Any]:
+        """
+        :param spec: the keys to read, everything if None
+        """
+        result = {}
+        data = self.data
+        while True:
+            tag_type = data[self.pos]
+            self.pos += 1
+            if tag_type == END:
+                return result
+            name = self.read_string()
+            wanted = True if spec is None else spec.get(name, False)
+            if wanted is False:
+                self.skip_payload(tag_type)
+            elif wanted is True:
+                result[name] = self.read_payload(tag_type)
+            elif tag_type == COMPOUND:
+                result[name] = self.read_compound(wanted)
+            else:
+                raise ValueError(f"{name} is not a compound, it can't be read with a nested spec")
+
+    def read_payload(self, tag_type: int) -> Any:
+        if tag_type in FORMATS:
+            (value,) = struct.unpack_from(FORMATS[tag_type], self.data, self.pos)
+            self.pos += FIXED_SIZES[tag_type]
+            return value
+        if tag_type == STRING:
+            return self.read_string()
+        if tag_type == COMPOUND:
+            return self.read_compound()
+        if tag_type == LIST:
+            item_type = self.data[self.pos]
+            (length,) = struct.unpack_from(">i", self.data, self.pos + 1)
+            self.pos += 5
+            if item_type in FORMATS:
+                values = list(struct.unpack_from(f">{length}{FORMATS[item_type][1]}", self.data, self.pos))
+                self.pos += length * FIXED_SIZES[item_type]
+                return values
+            return [self.read_payload(item_type) for _ in range(length)]
+        if tag_type in ARRAY_SIZES:
+            (length,) = struct.unpack_from(">i", self.data, self.pos)
+            self.pos += 4
+            values = list(struct.unpack_from(f">{length}{ARRAY_FORMATS[tag_type]}", self.data, self.pos))
+            self.pos += length * ARRAY_SIZES[tag_type]
+            return values
+        raise ValueError(f"unknown tag type {tag_type} at {self.pos}")
+
+    def skip_payload(self, tag_type: int):
+        if tag_type in FIXED_SIZES:
+            self.pos += FIXED_SIZES[tag_type]
+        elif tag_type == STRING:
+            self.skip_string()
+        elif tag_type in ARRAY_SIZES:
+            (length,) = struct.unpack_from(">i", self.data, self.pos)
+            self.pos += 4 + length * ARRAY_SIZES[tag_type]
+        elif tag_type == LIST:
+            item_type = self.data[self.pos]
+            (length,) = struct.unpack_from(">i", self.data, self.pos + 1)
+            self.pos += 5
+            if item_type in FIXED_SIZES:
+                self.pos += length * FIXED_SIZES[item_type]
+            else:
+                for _ in range(length):
+                    self.skip_payload(item_type)
+        elif tag_type == COMPOUND:
+            data = self.data
+            while True:
+                item_type = data[self.pos]
+                self.pos += 1
+                if item_type == END:
+                    return
+                self.skip_string()
+                self.skip_payload(item_type)
+        elif tag_type != END:
+            raise ValueError(f"unknown tag type {tag_type} at {self.pos}")
+
+
+def decompress(data: Union[bytes, memoryview]) -> bytes:
+    # level.dat is gzipped, but some tools write it uncompressed. zlib takes memoryviews as they are, unlike gzip which
+    # copies them into a BytesIO to read the header
+    if data[:2] == b"\x1f\x8b":
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    return bytes(data)
+
+
+def loads(data: bytes, spec: Optional[Spec] = None) -> dict[str, Any]:
+    """
+    :param data: an nbt file, gzipped or not
+    :param spec: the parts of the root compound to read, everything if None
+    :return: the root compound as plain python values (ints, floats, strs, lists and dicts)
+    """
+    return NBTReader(decompress(data)).read_root(spec)
+
+
+def load(path: Path, spec: Optional[Spec] = None) -> dict[str, Any]:
+    return loads(path.read_bytes(), spec)
@@ -0,0 +1,236 @@
+import os
+import random
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional
+
+import profiling
+from util import default_cache_dir
+
+if TYPE_CHECKING:
+    # imported where it's used, offline runs never need it
+    import requests
+
+PROFILE_URL = "https://api.minecraftservices.com/minecraft/profile/lookup/"
+
+UNKNOWN = "unknown uuid"
+HTTP_ERROR = "http error"
+NOT_CACHED = "not cached"
+
+DEFAULT_CONCURRENCY = 16
+RETRIES = 5
+
+
+def retry_delay(response: "requests.Response", attempt: int) -> float:
+    """
+    how long to wait after a 429, the api's Retry-After if it sent one, otherwise exponential backoff with jitter
+    """
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return 2 ** attempt + random.random()
+
+
+@dataclass
+class LookupConfig:
+    """
+    how player names are looked up, kept picklable so it can be handed to worker processes
+
+    cache_dir of None disables the on-disk cache, offline never touches the network and only reads the cache
+    """
+    cache_dir: Optional[Path] = field(default_factory=default_cache_dir)
+    ttl: float = 30 * 24 * 60 * 60
+    negative_ttl: float = 24 * 60 * 60
+    offline: bool = False
+    url: str = PROFILE_URL
+
+
+class PlayerCache:
+    """
+    uuid -> name lookups backed by a sqlite cache, names that don't exist are cached too (as NULL) with their own ttl
+    """
+
+    def __init__(self, config: LookupConfig):
+        self.config = config
+        self.session: Optional["requests.Session"] = None
+        # connections the session keeps per host
+        self.pool_size = 0
+        self.db: Optional[sqlite3.Connection] = None
+        if config.cache_dir is not None:
+            config.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(config.cache_dir.joinpath("players.sqlite"), timeout=30)
+            self.db.execute("pragma journal_mode=wal")
+            self.db.execute("create table if not exists players (uuid text primary key, name text, fetched real not null)")
+            self.db.commit()
+
+    def cached(self, uuid: str) -> tuple[bool, Optional[str]]:
+        """
+        :return: whether a fresh entry exists, and the cached name (None if the uuid is known not to exist)
+        """
+        if self.db is None:
+            return False, None
+        row = self.db.execute("select name, fetched from players where uuid = ?", (uuid,)).fetchone()
+        if row is None:
+            return False, None
+        name, fetched = row
+        ttl = self.config.ttl if name is not None else self.config.negative_ttl
+        if not self.config.offline and time.time() - fetched > ttl:
+            return False, None
+        return True, name
+
+    def store(self, uuid: str, name: Optional[str]):
+        if self.db is None:
+            return
+        with self.db:
+            self.db.execute("insert or replace into players values (?, ?, ?)", (uuid, name, time.time()))
+
+    def http(self, pool_size: int = DEFAULT_CONCURRENCY) -> "requests.Session":
+        """
+        :param pool_size: the threads that will share the session, see resolve_all
+        """
+        import requests
+        if self.session is None:
+            self.session = requests.Session()
+        if pool_size > self.pool_size:
+            # a bigger pool for a higher concurrency than the session was made for, otherwise connections past the
+            # pool's size are opened and thrown away on every request
+            self.pool_size = pool_size
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        return self.session
+
+    def request(self, uuid: str) -> Optional["requests.Response"]:
+        import requests
+        try:
+            with profiling.span("http lookup"):
+                # the session as it is, resolve_all's threads share it and only _resolve sizes its pool
+                return (self.session or self.http()).get(self.config.url + uuid, timeout=10)
+        except requests.RequestException:
+            return None
+
+    @staticmethod
+    def interpret(response: Optional["requests.Response"]) -> tuple[bool, Optional[str]]:
+        """
+        :return: whether the api gave a definitive answer, and the name (None if the uuid doesn't exist)
+        """
+        if response is None or response.status_code == 429:
+            return False, None
+        if response.status_code in (204, 404):
+            return True, None
+        if not response.ok:
+            return False, None
+        try:
+            return True, response.json().get("name")
+        except ValueError:
+            return False, None
+
+    def fetch(self, uuid: str) -> tuple[bool, Optional[str]]:
+        """
+        asks the profile api for a name, backing off while rate limited
+        """
+        response = self.request(uuid)
+        for attempt in range(RETRIES):
+            if response is None or response.status_code != 429:
+                break
+            time.sleep(retry_delay(response, attempt))
+            response = self.request(uuid)
+        return self.interpret(response)
+
+    def lookup(self, uuid: str) -> str:
+        found, name = self.cached(uuid)
+        if not found:
+            if self.config.offline:
+                return NOT_CACHED
+            found, name = self.fetch(uuid)
+            if not found:
+                return HTTP_ERROR
+            self.store(uuid, name)
+        return UNKNOWN if name is None else name
+
+
+config = LookupConfig()
+_cache: Optional[PlayerCache] = None
+_cache_pid: Optional[int] = None
+
+
+def configure(new_config: LookupConfig):
+    global config, _cache
+    config = new_config
+    _cache = None
+
+
+def cache() -> PlayerCache:
+    global _cache, _cache_pid
+    # sqlite connections and http sessions must not be shared with forked worker processes
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = PlayerCache(config)
+        _cache_pid = os.getpid()
+    return _cache
+
+
+def lookup(uuid: str) -> str:
+    return cache().lookup(uuid)
+
+
+async def _resolve(player_cache: PlayerCache, uuids: list[str], concurrency: int) -> dict[str, tuple[bool, Optional[str]]]:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    # create the session up front so the threads don't race to do it
+    player_cache.http(concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    # asyncio.to_thread's default executor has min(32, cpus + 4) threads, which would cap the requests in flight
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="lookup")
+    loop = asyncio.get_running_loop()
+    # a 429 on any request pauses all of them, the limit is per client rather than per request
+    resume_at = 0.0
+
+    async def resolve(uuid: str) -> tuple[bool, Optional[str]]:
+        nonlocal resume_at
+        async with semaphore:
+            for attempt in range(RETRIES + 1):
+                delay = resume_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                response = await loop.run_in_executor(pool, player_cache.request, uuid)
+                if response is None or response.status_code != 429 or attempt == RETRIES:
+                    return player_cache.interpret(response)
+                resume_at = max(resume_at, time.monotonic() + retry_delay(response, attempt))
+        return False, None
+
+    with pool:
+        results = await asyncio.gather(*(resolve(uuid) for uuid in uuids))
+    return dict(zip(uuids, results))
+
+
+def resolve_all(uuids: Iterable[str], concurrency: int = DEFAULT_CONCURRENCY) -> dict[str, str]:
+    """
+    looks up many players at once, only uuids that aren't cached hit the network and those are requested concurrently
+
+    :param uuids: the uuids to resolve, duplicates are only looked up once
+    :param concurrency: the number of requests in flight, each on its own thread
+    :return: uuid -> name, using the same placeholders as lookup
+    """
+    player_cache = cache()
+    names: dict[str, str] = {}
+    missing = []
+    for uuid in dict.fromkeys(uuids):
+        found, name = player_cache.cached(uuid)
+        if found:
+            names[uuid] = UNKNOWN if name is None else name
+        elif config.offline:
+            names[uuid] = NOT_CACHED
+        else:
+            missing.append(uuid)
+
+    if missing:
+        import asyncio
+        for uuid, (found, name) in asyncio.run(_resolve(player_cache, missing, max(concurrency, 1))).items():
+            if not found:
+                names[uuid] = HTTP_ERROR
+                continue
+            player_cache.store(uuid, name)
+            names[uuid] = UNKNOWN if name is None else name
+    return names
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import ContextManager
+
+# name, start (perf_counter seconds), duration in seconds, pid, thread id
+Span = tuple[str, float, float, int, int]
+
+enabled = False
+# every span finished in this process since the last drain, worker processes send theirs back to the parent (see batch)
+spans: list[Span] = []
+
+_DISABLED = nullcontext()
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        spans.append((self.name, self.start, time.perf_counter() - self.start, os.getpid(), threading.get_ident()))
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def span(name: str) -> ContextManager:
+    """
+    times a stage, does nothing unless profiling is enabled
+
+    with profiling.span("gunzip"):
+        ...
+    """
+    return _Timer(name) if enabled else _DISABLED
+
+
+def drain() -> list[Span]:
+    """
+    :return: the spans recorded so far, which are forgotten here
+    """
+    global spans
+    drained, spans = spans, []
+    return drained
+
+
+def merge(new_spans: list[Span]):
+    """
+    adds spans recorded in another process
+    """
+    spans.extend(new_spans)
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    # nearest rank
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def summary() -> str:
+    """
+    a table with the count, total, p50 and p95 of every stage, the slowest stage in total first
+    """
+    durations: dict[str, list[float]] = {}
+    for name, _, duration, _, _ in spans:
+        durations.setdefault(name, []).append(duration)
+    lines = [f"{'stage':<20} {'count':>7} {'total ms':>10} {'p50 ms':>9} {'p95 ms':>9}"]
+    for name, values in sorted(durations.items(), key=lambda item: sum(item[1]), reverse=True):
+        values.sort()
+        lines.append(f"{name:<20} {len(values):>7} {sum(values) * 1000:10.2f} {percentile(values, 50) * 1000:9.3f} {percentile(values, 95) * 1000:9.3f}")
+    return "\n".join(lines)
+
+
+def write_trace(path: Path):
+    """
+    writes the spans as a chrome trace, which chrome://tracing, perfetto and speedscope can open
+    """
+    events = [
+        {"name": name, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6, "pid": pid, "tid": tid}
+        for name, start, duration, pid, tid in spans
+    ]
+    with open(path, "w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
@@ -0,0 +1,318 @@
+import mmap
+import os
+import re
+import struct
+import zlib
+from dataclasses import dataclass, field
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+import nbt_stream
+import profiling
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from save import WorldSave
+
+# anvil files are split into 4 KiB sectors, the first two hold the chunk locations and the times they were saved
+SECTOR = 4096
+CHUNKS = 1024
+# the region folders of the overworld, the nether and the end, relative to the save
+FOLDERS = ["region", "DIM-1/region", "DIM1/region"]
+REGION_NAME = re.compile(r"r\.(-?\d+)\.(-?\d+)\.mca")
+# the speedrunigt record, relative to the save
+RECORD = "speedrunigt/record.json"
+
+# the parts of a chunk that are checked, before 1.18 everything but DataVersion is inside Level
+POSITION_SPEC: nbt_stream.Spec = {"xPos": True, "zPos": True, "InhabitedTime": True, "LastUpdate": True}
+CHUNK_SPEC: nbt_stream.Spec = {"DataVersion": True, "Level": POSITION_SPEC} | POSITION_SPEC
+
+# seconds a chunk's save time can be before the run started or after the world was last played, saves are only so
+# precise and the world is generated a little before the timer starts
+TIME_SLACK = 300
+# anomalies kept per region file
+MAX_ANOMALIES = 20
+
+
+@dataclass(slots=True)
+class Expected:
+    """
+    what every chunk of a save should agree with, from its level.dat and speedrunigt record
+    """
+    # Version.Id in level.dat
+    data_version: Optional[int] = None
+    # Time in level.dat
+    ticks: Optional[int] = None
+    players: int = 1
+    # unix times in seconds, when the run started (None without speedrunigt) and when the world was last played
+    started: Optional[int] = None
+    last_played: Optional[int] = None
+    # whether started is certain enough for chunks saved before it to be anomalies, rather than notes
+    started_certain: bool = True
+    # the most chunks to decompress per region file, all of them if None
+    chunk_limit: Optional[int] = None
+
+
+@dataclass(slots=True)
+class RegionResult:
+    """
+    what scan_region found in one region file
+    """
+    path: str
+    chunks: int = 0
+    # the chunks that were decompressed
+    read: int = 0
+    # data version -> chunks saved with it
+    data_versions: dict[int, int] = field(default_factory=dict)
+    anomalies: list[str] = field(default_factory=list)
+    dropped: int = 0
+    # things worth knowing that aren't anomalies
+    notes: list[str] = field(default_factory=list)
+
+    def anomaly(self, text: str):
+        if len(self.anomalies) < MAX_ANOMALIES:
+            self.anomalies.append(text)
+        else:
+            self.dropped += 1
+
+
+def sample(indices: list[int], limit: Optional[int]) -> list[int]:
+    """
+    :return: at most limit of indices spread evenly over them, all of them if limit is None
+    """
+    if limit is None or len(indices) <= limit:
+        return indices
+    if limit <= 0:
+        return []
+    step = len(indices) / limit
+    return [indices[int(i * step)] for i in range(limit)]
+
+
+def chunk_data(region: mmap.mmap, start: int, end: int) -> Optional[bytes]:
+    """
+    :param start: where the chunk's sectors start
+    :param end: where they end
+    :return: the chunk's uncompressed nbt, None if it's stored in a way that isn't read here
+    :raises ValueError: if the chunk doesn't fit in its sectors
+    """
+    (length,) = struct.unpack_from(">I", region, start)
+    if length < 1 or start + 4 + length > end:
+        raise ValueError(f"its length {length} doesn't fit in its sectors")
+    compression = region[start + 4]
+    # only this chunk's bytes are copied out of the mapping
+    payload = region[start + 5:start + 4 + length]
+    match compression:
+        case 1:
+            return zlib.decompress(payload, 16 + zlib.MAX_WBITS)
+        case 2:
+            return zlib.decompress(payload)
+        case 3:
+            return payload
+    # lz4 (1.20.5+), and chunks too big for the region file which are in a c.<x>.<z>.mcc file next to it (+128)
+    return None
+
+
+def check_chunk(result: RegionResult, expected: Expected, chunk: dict[str, Any], x: int, z: int):
+    level = chunk.get("Level", chunk)
+    data_version = chunk.get("DataVersion")
+    if data_version is not None:
+        result.data_versions[data_version] = result.data_versions.get(data_version, 0) + 1
+        if expected.data_version is not None and data_version != expected.data_version:
+            newer = "a newer" if data_version > expected.data_version else "an older"
+            result.anomaly(f"chunk {x}, {z} was saved by {newer} version (DataVersion {data_version}, level.dat has {expected.data_version})")
+    if level.get("xPos", x) != x or level.get("zPos", z) != z:
+        result.anomaly(f"chunk {level.get('xPos')}, {level.get('zPos')} is stored where chunk {x}, {z} belongs")
+    if expected.ticks is not None:
+        inhabited = level.get("InhabitedTime")
+        # each player near a chunk adds to its InhabitedTime
+        if inhabited is not None and inhabited > expected.ticks * max(expected.players, 1):
+            result.anomaly(f"chunk {x}, {z} was inhabited for {inhabited} ticks, but the world has only run {expected.ticks}")
+        last_update = level.get("LastUpdate")
+        if last_update is not None and last_update > expected.ticks:
+            result.anomaly(f"chunk {x}, {z} was last updated at tick {last_update}, after the world's {expected.ticks}")
+
+
+def scan_region(path: str, expected: Expected) -> RegionResult:
+    """
+    checks one region file: the header of every chunk through an mmap, and the contents of expected.chunk_limit of them
+
+    :param path: an r.<x>.<z>.mca file
+    """
+    with profiling.span("region file"):
+        result = RegionResult(path)
+        name = REGION_NAME.fullmatch(os.path.basename(path))
+        region_x, region_z = (int(name[1]), int(name[2])) if name is not None else (0, 0)
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                # the game creates region files before it writes any chunks to them
+                return result
+            if size < 2 * SECTOR:
+                result.anomaly(f"it's only {size} bytes, too short for a region header")
+                return result
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as region:
+                locations = struct.unpack_from(f">{CHUNKS}I", region, 0)
+                timestamps = struct.unpack_from(f">{CHUNKS}I", region, SECTOR)
+                present = [i for i in range(CHUNKS) if locations[i]]
+                result.chunks = len(present)
+                suspicious = []
+                # chunks saved before an uncertain start of the run, and how long before it the earliest was
+                early, earliest = 0, 0
+                used: list[tuple[int, int, int]] = []
+                for i in present:
+                    x, z = region_x * 32 + i % 32, region_z * 32 + i // 32
+                    offset, sectors = locations[i] >> 8, locations[i] & 0xFF
+                    if offset < 2 or (offset + sectors) * SECTOR > size:
+                        result.anomaly(f"chunk {x}, {z} points outside the file (sector {offset}, {sectors} long)")
+                        continue
+                    used.append((offset, offset + sectors, i))
+                    saved = timestamps[i]
+                    if expected.started is not None and 0 < saved < expected.started - TIME_SLACK:
+                        if not expected.started_certain:
+                            early, earliest = early + 1, max(earliest, expected.started - saved)
+                        else:
+                            result.anomaly(f"chunk {x}, {z} was saved {expected.started - saved} s before the run started")
+                            suspicious.append(i)
+                    elif expected.last_played is not None and saved > expected.last_played + TIME_SLACK:
+                        result.anomaly(f"chunk {x}, {z} was saved {saved - expected.last_played} s after the world was last played")
+                        suspicious.append(i)
+                if early:
+                    result.notes.append(f"{early} chunks were saved up to {earliest} s before LastPlayed less the run's "
+                                        f"rta, the world may have been opened again after the run")
+                used.sort()
+                for (_, previous_end, previous), (start, _, i) in zip(used, used[1:]):
+                    if start < previous_end:
+                        result.anomaly(f"chunks {previous} and {i} of the file share sectors")
+                # the chunks whose save times stand out are always read
+                readable = {i for _, _, i in used}
+                wanted = [i for i in suspicious if i in readable]
+                wanted += [i for i in sample(sorted(readable), expected.chunk_limit) if i not in wanted]
+                for i in wanted:
+                    x, z = region_x * 32 + i % 32, region_z * 32 + i // 32
+                    offset, sectors = locations[i] >> 8, locations[i] & 0xFF
+                    try:
+                        data = chunk_data(region, offset * SECTOR, (offset + sectors) * SECTOR)
+                        if data is None:
+                            continue
+                        chunk = nbt_stream.NBTReader(data).read_root(CHUNK_SPEC)
+                    except (ValueError, zlib.error, struct.error, IndexError) as e:
+                        result.anomaly(f"chunk {x}, {z} can't be read: {e}")
+                        continue
+                    result.read += 1
+                    check_chunk(result, expected, chunk, x, z)
+        return result
+
+
+def region_files(save_folder: Path) -> list[Path]:
+    files = []
+    for folder in FOLDERS:
+        directory = save_folder.joinpath(folder)
+        if directory.is_dir():
+            files.extend(sorted(path for path in directory.iterdir() if REGION_NAME.fullmatch(path.name)))
+    return files
+
+
+def _scan_in_worker(path: str, expected: Expected) -> tuple[RegionResult, list[profiling.Span]]:
+    # like batch's workers, the spans recorded in a worker are sent back with its result
+    return scan_region(path, expected), profiling.drain()
+
+
+def expectations(save: "WorldSave", chunk_limit: Optional[int] = None) -> Expected:
+    last_played = getattr(save, "last_played_ms", None)
+    ticks = getattr(save, "ticks", None)
+    record = save.speedrunigt_data
+    started, certain = None, True
+    if record is not None and record.rta_ms is not None:
+        if record.date_ms is not None:
+            # the record is written when the run ends
+            started = (record.date_ms - record.rta_ms) // 1000
+        elif last_played is not None:
+            # LastPlayed is only the end of the run if the world wasn't opened again after it: the record would have
+            # been written well before it, and the world would have ticked on past the run's rta
+            started = (last_played - record.rta_ms) // 1000
+            try:
+                written = save.fs.stat(RECORD)[1] // 1_000_000
+            except OSError:
+                written = None
+            certain = (written is not None and abs(last_played - written) <= TIME_SLACK * 1000
+                       and ticks is not None and ticks * 50 <= record.rta_ms + TIME_SLACK * 1000)
+    try:
+        # counted from stats/ rather than save.players, which looks up every name unless it's already been read
+        player_count = len(save.player_uuids(save.fs))
+    except OSError:
+        player_count = 1
+    return Expected(
+        data_version=save.data_version,
+        ticks=ticks,
+        players=player_count,
+        started=started,
+        started_certain=certain,
+        last_played=None if last_played is None else last_played // 1000,
+        chunk_limit=chunk_limit
+    )
+
+
+@dataclass(slots=True)
+class RegionScan:
+    """
+    the region files of one save
+    """
+    save_folder: str
+    files: list[RegionResult]
+    # why the save wasn't scanned, if it wasn't
+    skipped: Optional[str] = None
+
+    def render(self) -> str:
+        if self.skipped is not None:
+            return f"regions: not scanned, {self.skipped}\n"
+        chunks = sum(result.chunks for result in self.files)
+        read = sum(result.read for result in self.files)
+        anomalies = sum(len(result.anomalies) + result.dropped for result in self.files)
+        versions: dict[int, int] = {}
+        for result in self.files:
+            for version, count in result.data_versions.items():
+                versions[version] = versions.get(version, 0) + count
+        version_text = ", ".join(f"{count} at {version}" for version, count in sorted(versions.items())) or "no data versions"
+        lines = [f"regions: {len(self.files)} files, {chunks} chunks, {read} read ({version_text}), {anomalies or 'no'} anomalies\n"]
+        for result in self.files:
+            name = os.path.relpath(result.path, self.save_folder)
+            lines.extend(f"  {name}: {anomaly}\n" for anomaly in result.anomalies)
+            if result.dropped:
+                lines.append(f"  {name}: and {result.dropped} more\n")
+            lines.extend(f"  {name}: note: {note}\n" for note in result.notes)
+        return "".join(lines)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "skipped": self.skipped,
+            "files": [
+                {"path": result.path, "chunks": result.chunks, "read": result.read,
+                 "data_versions": {str(version): count for version, count in result.data_versions.items()},
+                 "anomalies": result.anomalies, "dropped_anomalies": result.dropped, "notes": result.notes}
+                for result in self.files
+            ]
+        }
+
+
+def scan_save(save_folder: Path, save: "WorldSave", executor: Optional["Executor"] = None,
+              chunk_limit: Optional[int] = None) -> RegionScan:
+    """
+    scans every region file of a save, spread across the executor's workers if there is one
+
+    :param save: the save, verified, for what its chunks should agree with
+    :param chunk_limit: the most chunks to decompress per region file, all of them if None
+    """
+    if not save_folder.is_dir():
+        return RegionScan(str(save_folder), [], "region files are only read from save folders, not archives")
+    with profiling.span("region scan"):
+        paths = [str(path) for path in region_files(save_folder)]
+        expected = expectations(save, chunk_limit)
+        if executor is None:
+            return RegionScan(str(save_folder), [scan_region(path, expected) for path in paths])
+        results = []
+        for result, spans in executor.map(_scan_in_worker, paths, repeat(expected), chunksize=max(1, len(paths) // 64)):
+            results.append(result)
+            profiling.merge(spans)
+        return RegionScan(str(save_folder), results)
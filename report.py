@@ -0,0 +1,205 @@
+import csv
+import statistics
+from pathlib import Path
+from typing import Any, Optional
+
+from batch import Result
+from gamerules import Deviation
+from seed_utils import is_random
+
+# the sections a report reads from each save, see WorldSave.load
+FIELDS = ["name", "seed", "speedrunigt", "timeline", "ticks", "players", "modded", "gamerules"]
+
+COLUMNS = ["path", "name", "version", "seed", "random_seed", "ticks", "igt_ms", "rta_ms", "players", "gamerule_deviations",
+           "timeline_anomalies", "modded", "error"]
+
+# how many median absolute deviations an igt/ticks ratio can be from the median before it's an outlier
+OUTLIER_THRESHOLD = 3.5
+# the ratio of a normal distribution's standard deviation to its median and mean absolute deviation
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+
+
+class Report:
+    """
+    compact records of every save in a batch, one list per column so 100k saves stay cheap, and checks across them
+
+    the checks group rows with dicts (seed -> rows, uuid -> rows) so each is one pass over the table
+    """
+
+    def __init__(self):
+        self.columns: dict[str, list[Any]] = {column: [] for column in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.columns["path"])
+
+    def add(self, save_folder: Path, save: Result):
+        """
+        :param save: a save verified with at least FIELDS loaded, or why it couldn't be
+        """
+        row = dict.fromkeys(COLUMNS)
+        row["path"] = str(save_folder)
+        if isinstance(save, Exception):
+            row["error"] = repr(save)
+        else:
+            speedrunigt = save.speedrunigt_data
+            row.update({
+                "name": save.world_name,
+                "version": None if save.game_version is None else str(save.game_version),
+                "seed": save.seed,
+                "random_seed": save.seed is not None and is_random(save.seed),
+                "ticks": save.ticks,
+                "igt_ms": None if speedrunigt is None else speedrunigt.igt_ms,
+                "rta_ms": None if speedrunigt is None else speedrunigt.rta_ms,
+                "players": list(save.players),
+                "gamerule_deviations": [deviation_text(deviation) for deviation in save.gamerule_diff],
+                "timeline_anomalies": None if save.timeline is None else save.timeline.anomalies,
+                "modded": save.modded
+            })
+        for column, values in self.columns.items():
+            values.append(row[column])
+
+    def duplicate_seeds(self) -> dict[int, list[int]]:
+        """
+        :return: seed -> the rows with it, for seeds found in more than one save
+        """
+        rows: dict[int, list[int]] = {}
+        for i, seed in enumerate(self.columns["seed"]):
+            if seed is not None:
+                rows.setdefault(seed, []).append(i)
+        return {seed: found for seed, found in rows.items() if len(found) > 1}
+
+    def shared_players(self) -> dict[str, list[int]]:
+        """
+        :return: uuid -> the rows with that player, for players found in more than one save
+        """
+        rows: dict[str, list[int]] = {}
+        for i, uuids in enumerate(self.columns["players"]):
+            for uuid in uuids or ():
+                rows.setdefault(uuid, []).append(i)
+        return {uuid: found for uuid, found in rows.items() if len(found) > 1}
+
+    def igt_ratios(self) -> list[Optional[float]]:
+        """
+        igt over the time the ticks in level.dat add up to, about 1 for a normal run. None without speedrunigt or ticks
+        """
+        return [
+            igt_ms / (ticks * 50) if igt_ms is not None and ticks else None
+            for igt_ms, ticks in zip(self.columns["igt_ms"], self.columns["ticks"])
+        ]
+
+    def outliers(self, threshold: float = OUTLIER_THRESHOLD) -> dict[int, float]:
+        """
+        saves whose igt/ticks ratio is unusually far from the rest of the batch, using the median and median absolute
+        deviation so the outliers themselves don't shift what counts as normal
+
+        :return: row -> how many (scaled) median absolute deviations its ratio is from the median
+        """
+        ratios = [(i, ratio) for i, ratio in enumerate(self.igt_ratios()) if ratio is not None]
+        if len(ratios) < 3:
+            return {}
+        median = statistics.median(ratio for _, ratio in ratios)
+        deviation = statistics.median(abs(ratio - median) for _, ratio in ratios) * MAD_SCALE
+        if deviation == 0:
+            # more than half the ratios are the same, fall back to the mean absolute deviation
+            deviation = statistics.fmean(abs(ratio - median) for _, ratio in ratios) * MEAN_AD_SCALE
+            if deviation == 0:
+                return {}
+        return {i: score for i, ratio in ratios if (score := abs(ratio - median) / deviation) > threshold}
+
+    def table(self) -> dict[str, list[Any]]:
+        """
+        the columns with the result of each check for each row added
+        """
+        seed_counts = [0] * len(self)
+        for found in self.duplicate_seeds().values():
+            for i in found:
+                seed_counts[i] = len(found)
+        shared = [0] * len(self)
+        for found in self.shared_players().values():
+            for i in found:
+                shared[i] += 1
+        outliers = self.outliers()
+        return self.columns | {
+            "saves_with_seed": seed_counts,
+            "shared_players": shared,
+            "igt_ratio": self.igt_ratios(),
+            "igt_outlier": [i in outliers for i in range(len(self))]
+        }
+
+    def summary(self) -> dict[str, Any]:
+        paths = self.columns["path"]
+        return {
+            "saves": len(self),
+            "errors": sum(error is not None for error in self.columns["error"]),
+            "duplicate_seeds": {str(seed): [paths[i] for i in found] for seed, found in self.duplicate_seeds().items()},
+            "shared_players": {uuid: [paths[i] for i in found] for uuid, found in self.shared_players().items()},
+            "igt_outliers": {paths[i]: score for i, score in self.outliers().items()},
+            "timeline_anomalies": {paths[i]: anomalies for i, anomalies in enumerate(self.columns["timeline_anomalies"]) if anomalies}
+        }
+
+    def render(self) -> str:
+        summary = self.summary()
+        ratios = self.igt_ratios()
+        lines = [f"report: {summary['saves']} saves, {summary['errors']} could not be verified\n"]
+        lines.append(f"duplicate seeds: {len(summary['duplicate_seeds']) or 'none'}\n")
+        for seed, paths in summary["duplicate_seeds"].items():
+            lines.append(f"  {seed}: {', '.join(paths)}\n")
+        lines.append(f"players in more than one save: {len(summary['shared_players']) or 'none'}\n")
+        for uuid, paths in summary["shared_players"].items():
+            lines.append(f"  {uuid}: {', '.join(paths)}\n")
+        lines.append(f"igt/ticks outliers: {len(summary['igt_outliers']) or 'none'}\n")
+        for i in self.outliers():
+            lines.append(f"  {self.columns['path'][i]}: igt {self.columns['igt_ms'][i]} ms for {self.columns['ticks'][i]} ticks "
+                         f"(ratio {ratios[i]:.2f})\n")
+        lines.append(f"saves with timeline anomalies: {len(summary['timeline_anomalies']) or 'none'}\n")
+        for path, anomalies in summary["timeline_anomalies"].items():
+            lines.append(f"  {path}: {'; '.join(anomalies)}\n")
+        return "".join(lines)
+
+    def write(self, path: Path):
+        """
+        writes the table as parquet if path ends in .parquet, csv otherwise
+        """
+        if path.suffix == ".parquet":
+            self.write_parquet(path)
+        else:
+            self.write_csv(path)
+
+    def write_csv(self, path: Path):
+        table = self.table()
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(table)
+            for row in zip(*table.values()):
+                writer.writerow(";".join(value) if isinstance(value, list) else value for value in row)
+
+    def write_parquet(self, path: Path):
+        """
+        needs pyarrow
+        """
+        import pyarrow
+        import pyarrow.parquet
+        text = pyarrow.string()
+        texts = pyarrow.list_(text)
+        # spelled out so every batch's file has the same schema, inferring it gives columns that are all None or
+        # all empty lists a null type
+        schema = pyarrow.schema([
+            ("path", text), ("name", text), ("version", text), ("seed", pyarrow.int64()), ("random_seed", pyarrow.bool_()),
+            ("ticks", pyarrow.int64()), ("igt_ms", pyarrow.int64()), ("rta_ms", pyarrow.int64()), ("players", texts),
+            ("gamerule_deviations", texts), ("timeline_anomalies", texts), ("modded", pyarrow.bool_()), ("error", text),
+            ("saves_with_seed", pyarrow.int64()), ("shared_players", pyarrow.int64()), ("igt_ratio", pyarrow.float64()),
+            ("igt_outlier", pyarrow.bool_())
+        ])
+        pyarrow.parquet.write_table(pyarrow.table(self.table(), schema=schema), path)
+
+
+def deviation_text(deviation: Deviation) -> str:
+    match deviation.problem:
+        case "changed":
+            return f"{deviation.name}={deviation.value}"
+        case "unexpected":
+            return f"{deviation.name}={deviation.value} (unexpected)"
+        case _:
+            return f"{deviation.name} (missing)"
+
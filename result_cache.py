@@ -0,0 +1,127 @@
+import copy
+import hashlib
+import os
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from save import WorldSave
+from savefs import SaveFS, open_save
+
+# bump whenever WorldSave changes shape, so older pickles are verified again instead of being loaded
+VERSION = 8
+
+
+def save_files(fs: SaveFS) -> list[str]:
+    """
+    the files a verdict depends on, sorted so stamps and digests don't depend on listing order
+    """
+    files = [file for file in ("level.dat", "speedrunigt/record.json", "speedrunigt/logs/igt_timer.log") if fs.exists(file)]
+    for folder in ("stats", "advancements"):
+        try:
+            files.extend(f"{folder}/{name}" for name in fs.listdir(folder))
+        except OSError:
+            pass
+    return sorted(files)
+
+
+def stamp(save_folder: Path) -> str:
+    """
+    a cheap fingerprint from the size and mtime of every file the verdict depends on, or of the archive itself
+    """
+    if save_folder.is_file():
+        stat = save_folder.stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    with open_save(save_folder) as fs:
+        return "\n".join(f"{file}:{':'.join(map(str, fs.stat(file)))}" for file in save_files(fs))
+
+
+def digest(save_folder: Path) -> str:
+    """
+    a hash of the contents of every file the verdict depends on, for when the stamp changed but the contents may not
+    have (copied or re-extracted saves)
+    """
+    h = hashlib.blake2b(digest_size=32)
+    with open_save(save_folder) as fs:
+        for file in save_files(fs):
+            h.update(file.encode())
+            h.update(b"\0")
+            h.update(fs.read_buffer(file))
+            h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    stores verified WorldSaves by path so that unchanged saves aren't parsed again
+    """
+
+    def __init__(self, cache_dir: Path, read: bool = True):
+        """
+        :param cache_dir: the folder to keep the cache in
+        :param read: use stored results, otherwise results are only stored
+        """
+        self.read = read
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(cache_dir.joinpath("results.sqlite"), timeout=30)
+        self.db.execute("pragma journal_mode=wal")
+        self.db.execute("create table if not exists results (path text primary key, version integer not null, stamp text not null, digest text not null, save blob not null)")
+        self.db.commit()
+        # key -> the digest get took of a save whose stamp had changed, stored with its new verdict by put
+        self.digests: dict[str, str] = {}
+
+    @staticmethod
+    def key(save_folder: Path) -> str:
+        return os.path.realpath(save_folder)
+
+    def get(self, save_folder: Path) -> Optional[WorldSave]:
+        """
+        :return: the stored save if the files it was read from haven't changed, otherwise None. its players map to None
+        (see put)
+        """
+        if not self.read:
+            return None
+        key = self.key(save_folder)
+        row = self.db.execute("select version, stamp, digest, save from results where path = ?", (key,)).fetchone()
+        if row is None or row[0] != VERSION:
+            return None
+        _, stored_stamp, stored_digest, blob = row
+        try:
+            current_stamp = stamp(save_folder)
+            if current_stamp != stored_stamp:
+                # only now are the files read, and the digest is kept for the next time the stamp changes
+                current_digest = digest(save_folder)
+                if current_digest != stored_digest:
+                    self.digests[key] = current_digest
+                    return None
+                with self.db:
+                    self.db.execute("update results set stamp = ? where path = ?", (current_stamp, key))
+            save = pickle.loads(blob)
+        except Exception:
+            # unreadable files or a pickle from an incompatible WorldSave, either way verify it again
+            return None
+        # the save may have been stored under another path to the same folder, e.g. a relative one from another
+        # working directory, and its lazy sections are read from wherever it's found now
+        save.save_folder = save_folder
+        return save
+
+    def put(self, save_folder: Path, save: WorldSave, save_stamp: str):
+        """
+        stores the verdict on a save, its players without their names, which are looked up again when it's read back
+        so they follow the name cache and its ttls
+
+        :param save_stamp: the save's stamp, taken before it was read
+        """
+        if "players" in save.__dict__:
+            save = copy.copy(save)
+            save.players = dict.fromkeys(save.players)
+        key = self.key(save_folder)
+        # without a digest from get, a changed stamp means verifying the save again, and that run stores one
+        save_digest = self.digests.pop(key, "")
+        try:
+            row = (key, VERSION, save_stamp, save_digest, pickle.dumps(save))
+        except Exception:
+            return
+        with self.db:
+            self.db.execute("insert or replace into results values (?, ?, ?, ?, ?)", row)
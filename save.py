@@ -1,19 +1,46 @@
-import json
-import os
 from datetime import timedelta, datetime
+from functools import cached_property
 from pathlib import Path
 from typing import Optional, Any
 
-import nbtlib
-import requests
 from semver import Version
 
+import advancements
+import log
+import nbt_stream
+import players
+import profiling
+from savefs import SaveFS, open_save
 from SpeedrunIGTInfo import SpeedrunIGTInfo
-from gamerules import Gamerule, gamerules
+from gamerules import Deviation, Gamerule, ruleset, save_gamerule
 from seed_utils import is_random
 from util import normalize_time
 
 
+# the parts of level.dat that WorldSave reads, everything else (the player, most of the world gen settings, ...) is skipped
+LEVEL_SPEC: nbt_stream.Spec = {
+    "Data": {
+        "LevelName": True,
+        "ServerBrands": True,
+        "Version": True,
+        "Time": True,
+        "LastPlayed": True,
+        "allowCommands": True,
+        "DragonFight": True,
+        "DimensionData": {"1": {"DragonFight": True}},
+        "hardcore": True,
+        "WasModded": True,
+        "RandomSeed": True,
+        "generatorOptions": True,
+        "MapFeatures": True,
+        "WorldGenSettings": {"seed": True, "bonus_chest": True, "generate_features": True},
+        "DataPacks": True,
+        "GameRules": True,
+        "Difficulty": True
+    }
+}
+
+
 class WorldSave:
     world_name: str
     game_version: Version
@@ -23,6 +50,10 @@ class WorldSave:
     ticks: int
     time_played: str
     last_played: str
+    # LastPlayed, unix time in milliseconds
+    last_played_ms: int
+    # Version.Id, None before 1.9
+    data_version: Optional[int] = None
     datapacks: list[str]
     bonus_chest: Optional[bool] = None
     cheats: bool
@@ -32,26 +63,49 @@ class WorldSave:
     dragon_ever_killed: bool
     dragon_death_count: int
     generator_options: str = ""
-    players: dict[str, str]
     gamerules: list[Gamerule]
-    advancements: list[str] = None
-    speedrunigt_data: SpeedrunIGTInfo = None
 
-    def __init__(self, save_folder: Path):
-        level_data: nbtlib.Compound = nbtlib.load(save_folder.joinpath("level.dat")).get("Data")
+    # the sections that can be printed, in order, see render
+    FIELDS = ["name", "seed", "settings", "speedrunigt", "timeline", "ticks", "datapacks", "dragon", "players", "modded", "gamerules", "advancements"]
+    # field -> the lazy section it's rendered from
+    SECTIONS = {"players": "players", "speedrunigt": "speedrunigt_data", "timeline": "timeline", "gamerules": "gamerule_diff", "advancements": "advancements"}
+
+    def __init__(self, save_folder: Path, resolve_players: bool = True):
+        """
+        reads level.dat, everything else (players, speedrunigt, advancements, the gamerule diff) is only read
+        the first time it's used
+
+        :param save_folder: the save to read, a folder or an archive of one (see savefs)
+        :param resolve_players: look up player names, otherwise players maps each uuid to None until the caller
+        fills them in (see players.resolve_all)
+        """
+        self.save_folder = save_folder
+        self.resolve_players = resolve_players
+        with profiling.span("read level.dat"):
+            data = self.fs.read_buffer("level.dat")
+        with profiling.span("gunzip"):
+            data = nbt_stream.decompress(data)
+        with profiling.span("nbt decode"):
+            level_data: dict[str, Any] = nbt_stream.loads(data, LEVEL_SPEC).get("Data")
+        with profiling.span("level.dat fields"):
+            self.read_level_data(level_data)
+
+    def read_level_data(self, level_data: dict[str, Any]):
         for name, value in level_data.items():
             # print(name + ": " + str(value))
             match name:
                 case "LevelName":
-                    self.world_name = value
+                    self.world_name = str(value)
                 case "ServerBrands":
-                    self.client = value[0]
+                    self.client = str(value[0])
                 case "Version":
                     self.game_version = Version.parse(value.get("Name"), True)
+                    self.data_version = value.get("Id")
                 case "Time":
                     self.ticks = int(value)
                     self.time_played = normalize_time(str(timedelta(seconds=value / 20)))
                 case "LastPlayed":
+                    self.last_played_ms = value
                     self.last_played = (datetime.utcfromtimestamp(value // 1000)
                                         .replace(microsecond=value % 1000 * 1000)
                                         .strftime("%H:%M:%S %d-%b-%Y UTC"))
@@ -68,7 +122,7 @@ class WorldSave:
                 case "RandomSeed":
                     self.seed = int(value)
                 case "generatorOptions":
-                    self.generator_options = value
+                    self.generator_options = str(value)
                 case "MapFeatures":
                     self.structures = value == 1
                 case "WorldGenSettings":
@@ -76,9 +130,9 @@ class WorldSave:
                     self.bonus_chest = value.get("bonus_chest") == 1
                     self.structures = value.get("generate_features") == 1
                 case "DataPacks":
-                    self.datapacks = value.get("Enabled")
+                    self.datapacks = [str(datapack) for datapack in value.get("Enabled")]
                 case "GameRules":
-                    self.gamerules = [Gamerule(rule_name, rule_value) for rule_name, rule_value in value.items()]
+                    self.gamerules = [save_gamerule(str(rule_name), str(rule_value)) for rule_name, rule_value in value.items()]
                 case "Difficulty":
                     diffs = {
                         -1: "negative peaceful (1.6-)",
@@ -89,18 +143,92 @@ class WorldSave:
                     }
                     self.difficulty = diffs.get(value)
 
-        self.players = self.parse_players(save_folder)
-        speedrunigt_folder = save_folder.joinpath("speedrunigt")
-        if speedrunigt_folder.exists():
-            self.speedrunigt_data = self.parse_speedrunigt(speedrunigt_folder)
-        advancements_folder = save_folder.joinpath("advancements")
-        if os.path.exists(advancements_folder):
-            advancements_files = os.listdir(advancements_folder)
-            self.advancements = set()
-            for f in advancements_files:
-                with open(os.path.join(save_folder.joinpath("advancements"), f)) as f:
-                    data = json.load(f)
-                    self.advancements.update(filter(lambda s: not s.startswith("minecraft:recipe") and "/" in s and data[s]["done"] == True, data))
+    @cached_property
+    def fs(self) -> SaveFS:
+        return open_save(self.save_folder)
+
+    def close(self):
+        """
+        closes the save's files (archives stay open otherwise), they're opened again if another section is read
+        """
+        fs = self.__dict__.pop("fs", None)
+        if fs is not None:
+            fs.close()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # open files can't be pickled, the unpickled save opens its own when it needs them
+        state = self.__dict__.copy()
+        state.pop("fs", None)
+        return state
+
+    @cached_property
+    def players(self) -> dict[str, Optional[str]]:
+        with profiling.span("players"):
+            return self.parse_players(self.fs, self.resolve_players)
+
+    @cached_property
+    def speedrunigt_data(self) -> Optional[SpeedrunIGTInfo]:
+        if self.fs.exists("speedrunigt"):
+            return self.parse_speedrunigt(self.fs)
+        return None
+
+    @cached_property
+    def timeline(self) -> Optional[log.Timeline]:
+        """
+        the checks on the run's splits, pauses and times, None without speedrunigt
+        """
+        if self.speedrunigt_data is None:
+            return None
+        return log.check(self.fs, self.speedrunigt_data, getattr(self, "ticks", None))
+
+    @cached_property
+    def advancements(self) -> Optional[advancements.AdvancementSet]:
+        if not self.fs.exists(advancements.FOLDER):
+            return None
+        with profiling.span("advancements"):
+            return advancements.read(self.fs)
+
+    @cached_property
+    def gamerule_diff(self) -> list[Deviation]:
+        """
+        every way the save's gamerules differ from the defaults for its version
+        """
+        with profiling.span("gamerule diff"):
+            correct_rules = ruleset(self.game_version)
+            diff = []
+            matched = 0
+            for rule in self.gamerules:
+                correct_rule = correct_rules.get(rule.name)
+                if correct_rule is None:
+                    diff.append(Deviation(rule.name, rule.default_value, None, "unexpected"))
+                    continue
+                matched += 1
+                if rule.default_value != correct_rule.default_value:
+                    diff.append(Deviation(rule.name, rule.default_value, correct_rule.default_value, "changed"))
+            # only look for missing rules if there are any
+            if matched < len(correct_rules):
+                rule_names = {rule.name for rule in self.gamerules}
+                for rule in correct_rules.values():
+                    if rule.name not in rule_names:
+                        diff.append(Deviation(rule.name, None, rule.default_value, "missing"))
+            return diff
+
+    def load(self, fields: Optional[list[str]] = None):
+        """
+        reads the lazy sections needed to render the given fields now, e.g. before the save is sent to another process
+
+        :param fields: the fields that will be rendered, all of them if None
+        """
+        for field in self.missing(fields):
+            getattr(self, self.SECTIONS[field])
+
+    def missing(self, fields: Optional[list[str]] = None) -> list[str]:
+        """
+        :param fields: the fields that will be rendered, all of them if None
+        :return: the fields whose sections haven't been read yet
+        """
+        return [field for field in (self.FIELDS if fields is None else fields)
+                if field in self.SECTIONS and self.SECTIONS[field] not in self.__dict__]
 
     @staticmethod
     def yes_no(t: Any):
@@ -110,81 +238,133 @@ class WorldSave:
             return "unknown"
 
     def __str__(self):
-        result = ""
-        result += f"name: {self.world_name}, v{self.nullify(self.game_version)}\n"
-        result += f"seed: {str(self.seed)}"
-        if not is_random(self.seed):
-            result += ", not random"
-        result += f"\ndifficulty: {self.difficulty}, structures: {self.yes_no(self.structures)}, cheats: {self.yes_no(self.cheats)}, hardcore: {self.yes_no(self.hardcore)}{self.generator_options}"
-        if self.bonus_chest is not None:
-            result += ", bonus chest: " + self.yes_no(self.bonus_chest)
-        result += "\n"
-        if self.speedrunigt_data is not None:
-            result += f"speedrunigt: igt: {self.speedrunigt_data.igt}, rta: {self.speedrunigt_data.rta}, cat: {self.speedrunigt_data.category}, "
-            result += f"seed type: {self.speedrunigt_data.run_type}, v{self.speedrunigt_data.version}\n"
-        else:
-            result += "speedrunigt not found\n"
-        result += f"ticks: {self.ticks} ({self.time_played}), last at {self.last_played}\n"
-        if self.game_version is not None and self.game_version >= Version(1, 13) and self.datapacks is not None:
-            result += f"datapacks: {'unknown' if self.datapacks is None else ', '.join(self.datapacks)}\n"
-        result += f"dragon: " + ("dead" if self.dragon_killed else "alive") + ", has died: " + self.yes_no(self.dragon_ever_killed) + f", times: {str(self.dragon_death_count)}\n"
-        result += "players: " + "\n".join([f"{name}, {uuid}" for uuid, name in self.players.items()]) + "\n"
-        result += f"modded: {self.yes_no(self.modded)}, client: {self.client if self.client is not None else 'unknown'}\n"
-        result += "gamerules: " + self.get_gamerule_text()
-        if self.advancements is not None:
-            result += "advancement count: " + str(len(self.advancements))
+        return self.render()
+
+    def render(self, fields: Optional[list[str]] = None) -> str:
+        """
+        :param fields: the sections to include (see FIELDS), all of them if None
+        """
+        fields = self.FIELDS if fields is None else fields
+        parts = []
+        if "name" in fields:
+            parts.append(f"name: {self.world_name}, v{self.nullify(self.game_version)}\n")
+        if "seed" in fields:
+            parts.append(f"seed: {str(self.seed)}{'' if is_random(self.seed) else ', not random'}\n")
+        if "settings" in fields:
+            parts.append(f"difficulty: {self.difficulty}, structures: {self.yes_no(self.structures)}, cheats: {self.yes_no(self.cheats)}, hardcore: {self.yes_no(self.hardcore)}{self.generator_options}")
+            if self.bonus_chest is not None:
+                parts.append(", bonus chest: " + self.yes_no(self.bonus_chest))
+            parts.append("\n")
+        if "speedrunigt" in fields:
+            if self.speedrunigt_data is not None:
+                parts.append(f"speedrunigt: igt: {self.speedrunigt_data.igt}, rta: {self.speedrunigt_data.rta}, cat: {self.speedrunigt_data.category}, ")
+                parts.append(f"seed type: {self.speedrunigt_data.run_type}, v{self.speedrunigt_data.version}\n")
+            else:
+                parts.append("speedrunigt not found\n")
+        if "timeline" in fields and self.timeline is not None:
+            parts.append(self.timeline.render())
+        if "ticks" in fields:
+            parts.append(f"ticks: {self.ticks} ({self.time_played}), last at {self.last_played}\n")
+        if "datapacks" in fields and self.game_version is not None and self.game_version >= Version(1, 13) and self.datapacks is not None:
+            parts.append(f"datapacks: {'unknown' if self.datapacks is None else ', '.join(self.datapacks)}\n")
+        if "dragon" in fields:
+            parts.append(f"dragon: {'dead' if self.dragon_killed else 'alive'}, has died: {self.yes_no(self.dragon_ever_killed)}, times: {str(self.dragon_death_count)}\n")
+        if "players" in fields:
+            parts.append("players: " + "\n".join([f"{name}, {uuid}" for uuid, name in self.players.items()]) + "\n")
+        if "modded" in fields:
+            parts.append(f"modded: {self.yes_no(self.modded)}, client: {self.client if self.client is not None else 'unknown'}\n")
+        if "gamerules" in fields:
+            parts.append("gamerules: " + self.get_gamerule_text())
+        if "advancements" in fields and self.advancements is not None:
+            parts.append("advancement count: " + str(len(self.advancements)))
         # TODO: add the rest of the set vars in the big case statement
+        return "".join(parts)
+
+    def to_dict(self, fields: Optional[list[str]] = None) -> dict[str, Any]:
+        """
+        the same information as render, as json-compatible values
+
+        :param fields: the sections to include (see FIELDS), all of them if None
+        """
+        fields = self.FIELDS if fields is None else fields
+        result: dict[str, Any] = {"path": str(self.save_folder)}
+        if "name" in fields:
+            result["name"] = self.world_name
+            result["version"] = None if self.game_version is None else str(self.game_version)
+        if "seed" in fields:
+            result["seed"] = self.seed
+            result["random_seed"] = is_random(self.seed)
+        if "settings" in fields:
+            result["difficulty"] = self.difficulty
+            result["structures"] = getattr(self, "structures", None)
+            result["cheats"] = getattr(self, "cheats", None)
+            result["hardcore"] = getattr(self, "hardcore", None)
+            result["generator_options"] = self.generator_options
+            result["bonus_chest"] = self.bonus_chest
+        if "speedrunigt" in fields:
+            result["speedrunigt"] = None if self.speedrunigt_data is None else self.speedrunigt_data.to_dict()
+        if "timeline" in fields:
+            result["timeline"] = None if self.timeline is None else self.timeline.to_dict()
+        if "ticks" in fields:
+            result["ticks"] = self.ticks
+            result["time_played"] = self.time_played
+            result["last_played"] = self.last_played
+        if "datapacks" in fields:
+            result["datapacks"] = getattr(self, "datapacks", None)
+        if "dragon" in fields:
+            result["dragon"] = {"killed": self.dragon_killed, "ever_killed": self.dragon_ever_killed, "death_count": self.dragon_death_count}
+        if "players" in fields:
+            result["players"] = [{"uuid": uuid, "name": name} for uuid, name in self.players.items()]
+        if "modded" in fields:
+            result["modded"] = self.modded
+            result["client"] = self.client
+        if "gamerules" in fields:
+            result["gamerules"] = [deviation.to_dict() for deviation in self.gamerule_diff]
+        if "advancements" in fields:
+            result["advancements"] = None if self.advancements is None else sorted(self.advancements)
         return result
 
     @staticmethod
     def nullify(t: Any):
         return t if t is not None else "null"
 
-    def parse_dragon_fight(self, dragon_fight: nbtlib.Compound):
+    def parse_dragon_fight(self, dragon_fight: dict[str, Any]):
         self.dragon_killed = dragon_fight.get("DragonKilled") == 1
         self.dragon_ever_killed = dragon_fight.get("PreviouslyKilled") == 1
         self.dragon_death_count = 20 - len(dragon_fight.get("Gateways"))
 
     @staticmethod
-    def parse_speedrunigt(save_folder: Path) -> Optional[SpeedrunIGTInfo]:
+    def parse_speedrunigt(fs: SaveFS) -> Optional[SpeedrunIGTInfo]:
         try:
-            return SpeedrunIGTInfo(save_folder)
+            return SpeedrunIGTInfo(fs)
         except FileNotFoundError:
             return None
 
     @staticmethod
     def get_player_name(uuid: str) -> str:
-        try:
-            name = requests.get("https://api.minecraftservices.com/minecraft/profile/lookup/" + uuid).json().get("name")
-            return "unknown uuid" if name is None else name
-        except requests.ConnectionError:
-            return "http error"
+        return players.lookup(uuid)
+
+    @staticmethod
+    def player_uuids(fs: SaveFS) -> list[str]:
+        return [file.split(".")[0] for file in fs.listdir("stats")]
 
-    def parse_players(self, save_folder: Path) -> dict[str, str]:
-        stats_files = os.listdir(save_folder.joinpath("stats"))
+    def parse_players(self, fs: SaveFS, resolve: bool = True) -> dict[str, Optional[str]]:
         return {
-            uuid: self.get_player_name(uuid)
-            for uuid in [file.split(".")[0] for file in stats_files]
+            uuid: self.get_player_name(uuid) if resolve else None
+            for uuid in self.player_uuids(fs)
         }
 
-    # we don't talk about this method
     def get_gamerule_text(self) -> str:
-        correct_rules = gamerules(self.game_version)
-        rule_names = {rule.name: rule for rule in self.gamerules}
-        correct_rules_names = {rule.name: rule for rule in correct_rules}
-        gamerule_text = ""
-        for rule in self.gamerules:
-            if rule.name not in correct_rules_names:
-                gamerule_text += str(rule) + " not in correct ruleset\n"
-            elif rule.default_value != correct_rules_names.get(rule.name).default_value:
-                gamerule_text += str(rule) + ", should be: " + str(
-                    correct_rules_names.get(rule.name).default_value) + "\n"
-        for rule in correct_rules_names:
-            if rule not in rule_names:
-                gamerule_text += str(rule) + " not in current ruleset\n"
-        if not gamerule_text:
-            gamerule_text = "all normal"
-        return gamerule_text + "\n"
+        lines = []
+        for deviation in self.gamerule_diff:
+            match deviation.problem:
+                case "unexpected":
+                    lines.append(f"{deviation.name}: {deviation.value} not in correct ruleset\n")
+                case "changed":
+                    lines.append(f"{deviation.name}: {deviation.value}, should be: {deviation.expected}\n")
+                case "missing":
+                    lines.append(f"{deviation.name} not in current ruleset\n")
+        return ("".join(lines) or "all normal") + "\n"
 
 #     def __str__(self):
 #         correct_rules = gamerules(self.game_version)
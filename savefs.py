@@ -0,0 +1,290 @@
+import mmap
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Optional, Union
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# how save folders are read: "read" opens and reads each file on its own, "mapped" uses MappedFS. see configure
+IO_MODES = ["read", "mapped"]
+io_mode = "read"
+
+# files at least this big are mmapped by MappedFS, smaller ones are read into a buffer
+MMAP_THRESHOLD = 1 << 20
+
+# MappedFS's read buffer, one per thread so that reads in different threads can't overwrite each other
+_buffers = threading.local()
+
+
+def configure(mode: str):
+    """
+    :param mode: one of IO_MODES, for every save folder opened afterwards
+    """
+    global io_mode
+    io_mode = mode
+
+
+def is_archive(path: Path) -> bool:
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+class SaveFS:
+    """
+    read-only access to the files of one save, wherever it's stored. paths are posix style and relative to the save
+    folder, e.g. "level.dat" or "stats/<uuid>.json"
+    """
+
+    def open(self, path: str) -> IO[bytes]:
+        raise NotImplementedError
+
+    def read_bytes(self, path: str) -> bytes:
+        with self.open(path) as f:
+            return f.read()
+
+    def read_text(self, path: str) -> str:
+        return self.read_bytes(path).decode("utf-8")
+
+    def read_buffer(self, path: str) -> Union[bytes, memoryview]:
+        """
+        the contents of a file, for a parser that's done with them before the next read: they can be a view of memory
+        that the next read reuses, so copy anything that's kept
+        """
+        return self.read_bytes(path)
+
+    def exists(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def listdir(self, path: str) -> list[str]:
+        """
+        :return: the names of the files and folders directly in the folder at path
+        :raises FileNotFoundError: if there is no such folder
+        """
+        raise NotImplementedError
+
+    def stat(self, path: str) -> tuple[int, int]:
+        """
+        :return: the size and modification time in nanoseconds of the file at path
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> "SaveFS":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DirectoryFS(SaveFS):
+    def __init__(self, root: Path):
+        self.root = root
+
+    def open(self, path: str) -> IO[bytes]:
+        return open(self.root.joinpath(path), "rb")
+
+    def read_bytes(self, path: str) -> bytes:
+        return self.root.joinpath(path).read_bytes()
+
+    def exists(self, path: str) -> bool:
+        return self.root.joinpath(path).exists()
+
+    def listdir(self, path: str) -> list[str]:
+        return os.listdir(self.root.joinpath(path))
+
+    def stat(self, path: str) -> tuple[int, int]:
+        stat = self.root.joinpath(path).stat()
+        return stat.st_size, stat.st_mtime_ns
+
+
+def reusable_buffer(size: int) -> bytearray:
+    """
+    :return: this thread's read buffer, grown to at least size bytes
+    """
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None or len(buffer) < size:
+        # a new bytearray rather than resizing, views of the old one may still be around
+        buffer = _buffers.buffer = bytearray(max(size, 2 * len(buffer) if buffer is not None else 1 << 16))
+    return buffer
+
+
+class MappedFS(DirectoryFS):
+    """
+    a save folder read with as few round trips as possible, for saves on slow (e.g. network) storage
+
+    each folder is listed once with scandir and its entries answer exists, listdir and stat from then on. read_buffer
+    reads files with readinto into a buffer that is reused for every file, or mmaps them if they're big, and hands the
+    parser a view of it instead of a new bytes object
+    """
+
+    def __init__(self, root: Path):
+        super().__init__(root)
+        self.folders: dict[str, dict[str, os.DirEntry]] = {}
+        self.mapped: Optional[mmap.mmap] = None
+        self.view: Optional[memoryview] = None
+
+    def entries(self, path: str) -> dict[str, os.DirEntry]:
+        path = path.strip("/")
+        if path not in self.folders:
+            with os.scandir(self.root.joinpath(path)) as scan:
+                self.folders[path] = {entry.name: entry for entry in scan}
+        return self.folders[path]
+
+    def entry(self, path: str) -> Optional[os.DirEntry]:
+        parent, name = posixpath.split(path.strip("/"))
+        try:
+            return self.entries(parent).get(name)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def exists(self, path: str) -> bool:
+        return not path.strip("/") or self.entry(path) is not None
+
+    def listdir(self, path: str) -> list[str]:
+        return list(self.entries(path))
+
+    def stat(self, path: str) -> tuple[int, int]:
+        entry = self.entry(path)
+        if entry is None:
+            raise FileNotFoundError(f"{path} not found in {self.root}")
+        stat = entry.stat()
+        return stat.st_size, stat.st_mtime_ns
+
+    def read_buffer(self, path: str) -> memoryview:
+        self.release()
+        with open(self.root.joinpath(path), "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size >= MMAP_THRESHOLD:
+                self.mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.view = memoryview(self.mapped)
+            else:
+                buffer = memoryview(reusable_buffer(size))
+                # a file that's still being written can be shorter by now
+                self.view = buffer[:file.readinto(buffer[:size])]
+        return self.view
+
+    def release(self):
+        """
+        lets go of the last file read_buffer returned
+        """
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.mapped is not None:
+            try:
+                self.mapped.close()
+            except BufferError:
+                # someone kept a view of it, it's unmapped once that's garbage collected
+                pass
+            self.mapped = None
+
+    def close(self):
+        self.release()
+        self.folders.clear()
+
+
+class ArchiveFS(SaveFS):
+    """
+    a save inside an archive, members are read one at a time without extracting anything to disk
+
+    the save is the shallowest folder in the archive that has a level.dat, so both archives of a save folder and
+    archives of its contents work
+    """
+
+    def __init__(self, archive: Path, names: list[str]):
+        self.archive = archive
+        level_dats = [name for name in names if posixpath.basename(name) == "level.dat"]
+        if not level_dats:
+            raise FileNotFoundError(f"{archive} does not contain a level.dat file")
+        self.prefix = posixpath.dirname(min(level_dats, key=lambda name: name.count("/")))
+        self.prefix = self.prefix + "/" if self.prefix else ""
+        self.files: set[str] = set()
+        self.folders: dict[str, set[str]] = {}
+        for name in names:
+            if not name.startswith(self.prefix) or name.endswith("/"):
+                continue
+            path = name[len(self.prefix):]
+            self.files.add(path)
+            parent, child = posixpath.split(path)
+            # archives don't have to contain entries for folders, so they're worked out from the file paths
+            while True:
+                self.folders.setdefault(parent, set()).add(child)
+                if not parent:
+                    break
+                parent, child = posixpath.split(parent)
+
+    def member(self, path: str) -> str:
+        if path not in self.files:
+            raise FileNotFoundError(f"{path} not found in {self.archive}")
+        return self.prefix + path
+
+    def exists(self, path: str) -> bool:
+        path = path.rstrip("/")
+        return path in self.files or path in self.folders
+
+    def listdir(self, path: str) -> list[str]:
+        path = path.rstrip("/")
+        if path not in self.folders:
+            raise FileNotFoundError(f"{path} not found in {self.archive}")
+        return sorted(self.folders[path])
+
+
+class ZipFS(ArchiveFS):
+    def __init__(self, archive: Path):
+        self.zip = zipfile.ZipFile(archive)
+        super().__init__(archive, self.zip.namelist())
+
+    def open(self, path: str) -> IO[bytes]:
+        return self.zip.open(self.member(path))
+
+    def stat(self, path: str) -> tuple[int, int]:
+        info = self.zip.getinfo(self.member(path))
+        return info.file_size, int(datetime(*info.date_time).timestamp() * 1e9)
+
+    def close(self):
+        self.zip.close()
+
+
+class TarFS(ArchiveFS):
+    def __init__(self, archive: Path):
+        self.tar = tarfile.open(archive)
+        self.members = {member.name: member for member in self.tar.getmembers() if member.isfile()}
+        super().__init__(archive, list(self.members))
+
+    def open(self, path: str) -> IO[bytes]:
+        return self.tar.extractfile(self.members[self.member(path)])
+
+    def stat(self, path: str) -> tuple[int, int]:
+        member = self.members[self.member(path)]
+        return member.size, int(member.mtime * 1e9)
+
+    def close(self):
+        self.tar.close()
+
+
+def open_save(path: Path) -> SaveFS:
+    """
+    :param path: a save folder, or a zip or tar archive of one
+    """
+    if path.is_dir():
+        return MappedFS(path) if io_mode == "mapped" else DirectoryFS(path)
+    if path.name.lower().endswith(".zip"):
+        return ZipFS(path)
+    if is_archive(path):
+        return TarFS(path)
+    raise FileNotFoundError(f"{path} is not a save folder or archive")
+
+
+def archive_has_save(path: Path) -> bool:
+    try:
+        save = open_save(path)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        return False
+    save.close()
+    return True
@@ -0,0 +1,78 @@
+import heapq
+import os
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterator, Optional
+
+from savefs import ARCHIVE_SUFFIXES
+
+
+def walk_saves(root: Path, follow_symlinks: bool = False, archives: bool = False) -> Iterator[tuple[str, os.DirEntry]]:
+    """
+    finds every folder under root that contains a level.dat, without descending into saves themselves
+
+    every directory is listed exactly once and nothing is stat-ed, the entry that marks a save is yielded with it so
+    callers can get its mtime from the listing
+
+    :param archives: also yield zip and tar files (see savefs), their contents aren't checked
+    :return: the path of each save and its level.dat entry, or the archive's own entry
+    """
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        level_dat = next((entry for entry in entries if entry.name == "level.dat"), None)
+        if level_dat is not None:
+            yield directory, level_dat
+            continue
+        entries.sort(key=lambda e: e.name)
+        if archives:
+            for entry in entries:
+                if entry.name.lower().endswith(ARCHIVE_SUFFIXES) and entry.is_file(follow_symlinks=follow_symlinks):
+                    yield entry.path, entry
+        # reversed so that the stack pops them in name order
+        for entry in reversed(entries):
+            try:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    stack.append(entry.path)
+            except OSError:
+                pass
+
+
+def scan_saves(root: Path, pattern: Optional[str] = None, since: Optional[float] = None, newest: Optional[int] = None,
+               follow_symlinks: bool = False, archives: bool = False) -> Iterator[Path]:
+    """
+    lazily yields the saves under root, for pointing the verifier at whole instance folders
+
+    :param root: the folder to search, e.g. a .minecraft/saves folder or a folder of instances
+    :param pattern: only saves whose folder name matches this glob
+    :param since: only saves whose level.dat was modified at or after this unix time
+    :param newest: only the newest this many saves (by level.dat mtime), newest first. this has to see every match
+    before yielding anything
+    :param follow_symlinks: descend into symlinked folders
+    :param archives: also yield zip and tar files, matching the pattern against their file name
+    """
+    def matches() -> Iterator[tuple[float, Path]]:
+        for save, entry in walk_saves(root, follow_symlinks, archives):
+            if pattern is not None and not fnmatch(os.path.basename(save), pattern):
+                continue
+            if since is None and newest is None:
+                yield 0, Path(save)
+                continue
+            try:
+                modified = entry.stat().st_mtime
+            except OSError:
+                continue
+            if since is None or modified >= since:
+                yield modified, Path(save)
+
+    if newest is None:
+        for _, folder in matches():
+            yield folder
+    else:
+        for _, folder in heapq.nlargest(newest, matches(), key=lambda match: match[0]):
+            yield folder
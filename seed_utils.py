@@ -1,42 +1,79 @@
-from fixedint import Int64, Int32
+MASK_32 = (1 << 32) - 1
+MASK_48 = (1 << 48) - 1
+MASK_64 = (1 << 64) - 1
 
 
-def to_bin(x, bits: int) -> str:
-    x = bin(x)[2:]
-    if x[0] == "b":
-        return twos_complement(x[1:], bits)
-    else:
-        return x
+def to_int64(x: int) -> int:
+    """
+    wraps x like a java long
+    """
+    x &= MASK_64
+    return x - (1 << 64) if x >> 63 else x
 
 
-def twos_complement(x: str, bits: int) -> str:
-    for i in range(bits - len(x)):
-        x = "0" + x
-    x_list = list(x)
-    for i in range(bits):
-        if x_list[bits - i - 1] == "1":
-            x_list[bits - i - 1] = "0"
-        else:
-            x_list[bits - i - 1] = "1"
-    return "".join(x_list)
+def to_int32(x: int) -> int:
+    """
+    wraps x like a java int
+    """
+    x &= MASK_32
+    return x - (1 << 32) if x >> 31 else x
 
 
 def unsigned_right_shift_32(x: int) -> int:
-    if x >= 0:
-        return x >> 32
-    else:
-        e = to_bin(x, 64)
-        if len(e) > 32:
-            return int(e[:32], 2)
-        else:
-            return x
+    """
+    java's x >>> 32 for a long
+    """
+    return (x & MASK_64) >> 32
 
 
 def is_random(seed) -> bool:
-    a = Int64(seed)
-    b = Int64(18218081)
-    c = Int64(1) << 48
-    d = Int64(7847617)
-    e = ((d * ((unsigned_right_shift_32(a) * 24667315 + b * Int32(a) + 67552711) >> 32) - b *
-          ((-4824621 * unsigned_right_shift_32(a) + d * Int32(a) + d) >> 32)) - 11) * Int64(0xdfe05bcb1365) % c
-    return ((((Int64(0x5deece66d) * e + 11) % c) >> 16) << 32) + Int32(((Int64(0xbb20b4600a69) * e + Int64(0x40942de6ba)) % c) >> 16) == a
+    """
+    whether a seed can come out of new Random().nextLong(), i.e. whether it could have been randomly generated
+    by the game rather than typed in
+
+    finds the java.util.Random state that nextLong would have produced the seed from and checks that it does
+    """
+    a = to_int64(int(seed))
+    b = 18218081
+    d = 7847617
+    high = unsigned_right_shift_32(a)
+    low = to_int32(a)
+    e = ((d * (to_int64(high * 24667315 + b * low + 67552711) >> 32) - b *
+          (to_int64(-4824621 * high + d * low + d) >> 32)) - 11) * 0xdfe05bcb1365 & MASK_48
+    return to_int64((((0x5deece66d * e + 11) & MASK_48) >> 16 << 32) + to_int32(((0xbb20b4600a69 * e + 0x40942de6ba) & MASK_48) >> 16)) == a
+
+
+def is_random_batch(seeds):
+    """
+    is_random for a whole array of seeds at once, needs numpy
+
+    :param seeds: an array-like of int64 or uint64 seeds (uint64 is read as the two's complement bits of the long)
+    :return: a numpy bool array, true where the seed could have been randomly generated
+    """
+    import numpy as np
+
+    seeds = np.asarray(seeds)
+    if seeds.dtype.kind not in "iu":
+        raise TypeError(f"seeds must be integers, not {seeds.dtype}")
+    # all the arithmetic is done on uint64, which wraps like java longs, and reinterpreted as int64 for signed shifts
+    a = seeds.astype(np.int64 if seeds.dtype.kind == "i" else np.uint64).view(np.uint64)
+    u64 = np.uint64
+    mask_48 = u64(MASK_48)
+
+    def sign_extend_32(x):
+        return x.astype(np.uint32).view(np.int32).astype(np.int64).view(np.uint64)
+
+    def signed_shift_32(x):
+        return (x.view(np.int64) >> np.int64(32)).view(np.uint64)
+
+    with np.errstate(over="ignore"):
+        high = a >> u64(32)
+        low = sign_extend_32(a & u64(MASK_32))
+        b = u64(18218081)
+        d = u64(7847617)
+        t1 = signed_shift_32(high * u64(24667315) + b * low + u64(67552711))
+        t2 = signed_shift_32(high * u64(-4824621 & MASK_64) + d * low + d)
+        e = ((d * t1 - b * t2 - u64(11)) * u64(0xdfe05bcb1365)) & mask_48
+        first = ((u64(0x5deece66d) * e + u64(11)) & mask_48) >> u64(16)
+        second = ((u64(0xbb20b4600a69) * e + u64(0x40942de6ba)) & mask_48) >> u64(16)
+        return ((first << u64(32)) + sign_extend_32(second)) == a
@@ -0,0 +1,209 @@
+import json
+import os
+import signal
+import socketserver
+import stat
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Any, Optional, Union
+from urllib.parse import parse_qs, urlsplit
+
+import players
+from batch import make_executor, verify_all
+from result_cache import ResultCache
+from save import WorldSave
+
+DEFAULT_PORT = 8765
+
+
+class Verifier:
+    """
+    verifies the saves of each request with everything kept warm between requests: the worker pool, the result cache
+    and, through players, the name cache and its http session
+    """
+
+    def __init__(self, jobs: int = 1, fields: Optional[list[str]] = None, lookup_concurrency: Optional[int] = None,
+                 results: Optional[ResultCache] = None):
+        """
+        :param fields: the fields to return when a request doesn't ask for any, all of them if None
+        """
+        self.jobs = jobs
+        self.fields = fields
+        self.lookup_concurrency = lookup_concurrency
+        self.results = results
+        self.executor = make_executor(jobs) if jobs > 1 else None
+        if not players.config.offline:
+            players.cache().http(lookup_concurrency or players.DEFAULT_CONCURRENCY)
+
+    def verify(self, paths: list[str], fields: Optional[list[str]], output_format: str) -> tuple[str, bytes]:
+        """
+        :return: the content type and body of the response
+        """
+        fields = self.fields if fields is None else fields
+        verified = verify_all([Path(path) for path in paths], self.jobs, True, fields, self.lookup_concurrency,
+                              self.results, executor=self.executor)
+        parts: list[Union[str, dict[str, Any]]] = []
+        for save_folder, save in verified:
+            # rendering can still read sections and fail, which is that save's error like any other
+            if not isinstance(save, Exception):
+                try:
+                    parts.append(save.render(fields) + "\n" if output_format == "text" else save.to_dict(fields))
+                    continue
+                except Exception as e:
+                    save = e
+            if output_format == "text":
+                parts.append(f"{save_folder}: could not verify save: {save!r}\n")
+            else:
+                parts.append({"path": str(save_folder), "error": repr(save)})
+        if output_format == "text":
+            return "text/plain; charset=utf-8", "".join(parts).encode()
+        return "application/json", json.dumps({"results": parts}).encode()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def parse_request(query: dict[str, Any]) -> tuple[list[str], Optional[list[str]], str]:
+    """
+    checks the paths, fields and format of a request, the same for query strings and json bodies
+
+    :return: the paths, fields (None for the server's default) and format
+    """
+    paths = query.get("paths", [])
+    if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+        raise BadRequest("paths must be a list of strings")
+    if not paths:
+        raise BadRequest("no paths given")
+    fields = query.get("fields")
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+    if fields is not None:
+        if not isinstance(fields, list) or not all(field in WorldSave.FIELDS for field in fields):
+            raise BadRequest(f"fields must be a list of {', '.join(WorldSave.FIELDS)}")
+    output_format = query.get("format", "json")
+    if output_format not in ("json", "text"):
+        raise BadRequest("format must be json or text")
+    return paths, fields, output_format
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    GET /health
+    GET /verify?path=...&path=...&fields=name,seed&format=json|text
+    POST /verify with {"paths": [...], "fields": [...], "format": "json" | "text"}
+    """
+    server: Union["VerifierHTTPServer", "VerifierUnixServer"]
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self.respond(200, "application/json", b'{"status": "ok"}')
+        elif url.path == "/verify":
+            query = parse_qs(url.query)
+            request = {"paths": query.get("path", [])}
+            if "fields" in query:
+                request["fields"] = query["fields"][-1]
+            if "format" in query:
+                request["format"] = query["format"][-1]
+            self.verify(request)
+        else:
+            self.error(404, "not found")
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/verify":
+            self.error(404, "not found")
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError:
+            self.error(400, "the body must be json")
+            return
+        if not isinstance(request, dict):
+            self.error(400, "the body must be a json object")
+            return
+        self.verify(request)
+
+    def verify(self, request: dict[str, Any]):
+        try:
+            paths, fields, output_format = parse_request(request)
+        except BadRequest as e:
+            self.error(400, str(e))
+            return
+        self.respond(200, *self.server.verifier.verify(paths, fields, output_format))
+
+    def error(self, status: int, message: str):
+        self.respond(status, "application/json", json.dumps({"error": message}).encode())
+
+    def respond(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix socket"
+
+
+class VerifierHTTPServer(HTTPServer):
+    def __init__(self, address: tuple[str, int], verifier: Verifier):
+        super().__init__(address, Handler)
+        self.verifier = verifier
+
+
+class VerifierUnixServer(socketserver.UnixStreamServer):
+    def __init__(self, path: str, verifier: Verifier):
+        super().__init__(path, Handler)
+        self.verifier = verifier
+
+
+def parse_address(address: str) -> Union[tuple[str, int], str]:
+    """
+    :param address: a port, host:port or the path of a unix socket, DEFAULT_PORT on localhost if empty
+    :return: (host, port), or the socket's path
+    """
+    if not address:
+        return "127.0.0.1", DEFAULT_PORT
+    if address.isdigit():
+        return "127.0.0.1", int(address)
+    host, _, port = address.rpartition(":")
+    if port.isdigit() and "/" not in address:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(address: str, verifier: Verifier):
+    """
+    answers verify requests until interrupted or terminated, one at a time (use jobs for parallelism within a request)
+
+    :param address: see parse_address
+    """
+    parsed = parse_address(address)
+    if isinstance(parsed, str):
+        if os.path.exists(parsed) and stat.S_ISSOCK(os.stat(parsed).st_mode):
+            # left behind by a server that didn't shut down cleanly
+            os.unlink(parsed)
+        server = VerifierUnixServer(parsed, verifier)
+    else:
+        server = VerifierHTTPServer(parsed, verifier)
+    # service managers stop daemons with SIGTERM, shut down as cleanly as on ctrl-c
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        verifier.close()
+        if isinstance(parsed, str):
+            os.unlink(parsed)
@@ -0,0 +1,93 @@
+"""
+checks that nbt_stream reads the synthetic level.dat of every kind in synthetic.KINDS the same as nbtlib, whole and
+with WorldSave's LEVEL_SPEC
+
+usage: python tests/test_nbt_stream.py [-v] (or python -m unittest discover tests)
+needs nbtlib
+"""
+
+import gzip
+import os
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import nbt_stream
+from save import LEVEL_SPEC
+
+try:
+    import nbtlib
+    from synthetic import KINDS, level_dat
+except ImportError:
+    nbtlib = None
+
+
+def plain(tag: Any) -> Any:
+    """
+    an nbtlib tag as the plain values nbt_stream reads
+    """
+    if isinstance(tag, dict):
+        return {key: plain(value) for key, value in tag.items()}
+    if isinstance(tag, nbtlib.tag.Array):
+        return [int(value) for value in tag]
+    if isinstance(tag, list):
+        return [plain(value) for value in tag]
+    if isinstance(tag, str):
+        return str(tag)
+    if isinstance(tag, float):
+        return float(tag)
+    return int(tag)
+
+
+def select(compound: dict[str, Any], spec: nbt_stream.Spec) -> dict[str, Any]:
+    """
+    the parts of a compound a spec asks for, as nbt_stream reads them
+    """
+    return {key: compound[key] if spec[key] is True else select(compound[key], spec[key])
+            for key in compound if spec.get(key, False) is not False}
+
+
+@unittest.skipIf(nbtlib is None, "needs nbtlib")
+class LevelDatTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def level_dats(self) -> list[tuple[str, Path]]:
+        paths = []
+        for i, version in enumerate(KINDS):
+            path = self.directory.joinpath(f"{version}.dat")
+            rng = random.Random(i)
+            level_dat(version, rng, rng.getrandbits(63), items=40, mods=5, name=version).save(path)
+            paths.append((version, path))
+        return paths
+
+    def test_whole(self):
+        for version, path in self.level_dats():
+            with self.subTest(version):
+                self.assertEqual(nbt_stream.load(path), plain(nbtlib.load(path)))
+
+    def test_level_spec(self):
+        for version, path in self.level_dats():
+            with self.subTest(version):
+                expected = select(plain(nbtlib.load(path)), LEVEL_SPEC)
+                self.assertEqual(nbt_stream.load(path, LEVEL_SPEC), expected)
+                # everything WorldSave reads is in there, the spec isn't silently skipping the file
+                self.assertIn("LevelName", expected["Data"])
+
+    def test_uncompressed(self):
+        for version, path in self.level_dats():
+            with self.subTest(version):
+                raw = gzip.decompress(path.read_bytes())
+                self.assertEqual(nbt_stream.loads(raw, LEVEL_SPEC), nbt_stream.load(path, LEVEL_SPEC))
+
+
+if __name__ == "__main__":
+    unittest.main()
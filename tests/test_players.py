@@ -0,0 +1,172 @@
+"""
+checks players' name cache against a local stand-in for the profile api: ttls, cached missing profiles, retrying when
+rate limited, and offline lookups never sending a request
+
+usage: python tests/test_players.py [-v] (or python -m unittest discover tests)
+needs requests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import players
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+NAMED = "0b8d2e4c-7a3f-4e7c-9b0e-3d6f1c2a5e8b"
+MISSING = "5f1e9c3a-2b7d-4f6e-8a1c-9d0b4e7f2c6a"
+LIMITED = "c3a7e1f9-6d2b-4c8e-a5f0-1b9d7e3c4a2f"
+
+
+class ProfileHandler(BaseHTTPRequestHandler):
+    """
+    GET /<uuid>: the profile of NAMED, 404 for anything else, with LIMITED answering 429 until its rate limit runs out
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server: ProfileServer = self.server
+        uuid = self.path.strip("/")
+        with server.lock:
+            server.requests.append(uuid)
+            limited = uuid == LIMITED and server.limited > 0
+            if limited:
+                server.limited -= 1
+        if limited:
+            self.respond(429, {"error": "TOO_MANY_REQUESTS"}, {"Retry-After": "0"})
+        elif uuid in (NAMED, LIMITED):
+            self.respond(200, {"id": uuid.replace("-", ""), "name": f"player {uuid[:4]}"})
+        else:
+            self.respond(404, {"errorMessage": f"Couldn't find any profile with id {uuid}"})
+
+    def respond(self, status: int, body: dict, headers: Optional[dict[str, str]] = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class ProfileServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ProfileHandler)
+        self.lock = threading.Lock()
+        self.requests: list[str] = []
+        # 429s left before LIMITED is answered
+        self.limited = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/"
+
+
+@unittest.skipIf(requests is None, "needs requests")
+class PlayerCacheTest(unittest.TestCase):
+    server: ProfileServer
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ProfileServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = Path(directory.name)
+        self.server.requests.clear()
+        self.server.limited = 0
+
+    def player_cache(self, **options) -> players.PlayerCache:
+        player_cache = players.PlayerCache(players.LookupConfig(cache_dir=self.cache_dir, url=self.server.url, **options))
+        self.addCleanup(player_cache.db.close)
+        return player_cache
+
+    def age(self, player_cache: players.PlayerCache, uuid: str, seconds: float):
+        # as if the entry had been fetched seconds earlier
+        with player_cache.db:
+            player_cache.db.execute("update players set fetched = fetched - ? where uuid = ?", (seconds, uuid))
+
+    def test_ttl(self):
+        player_cache = self.player_cache(ttl=60)
+        self.assertEqual(player_cache.lookup(NAMED), f"player {NAMED[:4]}")
+        self.assertEqual(player_cache.lookup(NAMED), f"player {NAMED[:4]}")
+        self.assertEqual(self.server.requests, [NAMED])
+        self.age(player_cache, NAMED, 120)
+        self.assertEqual(player_cache.lookup(NAMED), f"player {NAMED[:4]}")
+        self.assertEqual(self.server.requests, [NAMED, NAMED])
+
+    def test_missing_profiles_are_cached(self):
+        player_cache = self.player_cache(negative_ttl=60)
+        self.assertEqual(player_cache.lookup(MISSING), players.UNKNOWN)
+        self.assertEqual(player_cache.cached(MISSING), (True, None))
+        self.assertEqual(player_cache.lookup(MISSING), players.UNKNOWN)
+        self.assertEqual(self.server.requests, [MISSING])
+        # the negative ttl runs out on its own, long before the positive one would
+        self.age(player_cache, MISSING, 120)
+        self.assertEqual(player_cache.lookup(MISSING), players.UNKNOWN)
+        self.assertEqual(self.server.requests, [MISSING, MISSING])
+
+    def test_retry_when_rate_limited(self):
+        self.server.limited = 2
+        player_cache = self.player_cache()
+        self.assertEqual(player_cache.lookup(LIMITED), f"player {LIMITED[:4]}")
+        self.assertEqual(self.server.requests, [LIMITED] * 3)
+
+    def test_retry_when_rate_limited_in_resolve_all(self):
+        self.server.limited = 2
+        players.configure(players.LookupConfig(cache_dir=self.cache_dir, url=self.server.url))
+        self.addCleanup(players.configure, players.LookupConfig())
+        names = players.resolve_all([NAMED, MISSING, LIMITED, NAMED], 2)
+        self.assertEqual(names, {NAMED: f"player {NAMED[:4]}", MISSING: players.UNKNOWN, LIMITED: f"player {LIMITED[:4]}"})
+        self.assertEqual(sorted(self.server.requests), sorted([NAMED, MISSING] + [LIMITED] * 3))
+
+    def test_giving_up_when_rate_limited(self):
+        self.server.limited = players.RETRIES + 1
+        player_cache = self.player_cache()
+        self.assertEqual(player_cache.lookup(LIMITED), players.HTTP_ERROR)
+        self.assertEqual(player_cache.cached(LIMITED), (False, None))
+        self.assertEqual(len(self.server.requests), players.RETRIES + 1)
+
+    def test_offline(self):
+        self.player_cache().lookup(NAMED)
+        self.server.requests.clear()
+        player_cache = self.player_cache(offline=True, ttl=60)
+        # stale entries are still used offline, and nothing that isn't cached is requested
+        self.age(player_cache, NAMED, 120)
+        self.assertEqual(player_cache.lookup(NAMED), f"player {NAMED[:4]}")
+        self.assertEqual(player_cache.lookup(MISSING), players.NOT_CACHED)
+        players.configure(players.LookupConfig(cache_dir=self.cache_dir, url=self.server.url, offline=True))
+        self.addCleanup(players.configure, players.LookupConfig())
+        self.assertEqual(players.resolve_all([NAMED, MISSING, LIMITED]),
+                         {NAMED: f"player {NAMED[:4]}", MISSING: players.NOT_CACHED, LIMITED: players.NOT_CACHED})
+        self.assertEqual(self.server.requests, [])
+        self.assertIsNone(player_cache.session)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+checks seed_utils.is_random and is_random_batch against the fixedint implementation they replaced, which is copied
+below exactly as it was
+
+usage: python tests/test_seed_utils.py [-v] (or python -m unittest discover tests)
+needs fixedint, and numpy for is_random_batch
+
+the old unsigned_right_shift_32 is one less than java's >>> 32 for negative seeds whose low 32 bits are all zero, but
+is_random gives the same verdict for them either way, which edge_seeds checks
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import seed_utils
+
+try:
+    from fixedint import Int64, Int32
+except ImportError:
+    Int64 = Int32 = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# seed_utils.py before it moved to plain integers, unchanged
+
+
+def to_bin(x, bits: int) -> str:
+    x = bin(x)[2:]
+    if x[0] == "b":
+        return twos_complement(x[1:], bits)
+    else:
+        return x
+
+
+def twos_complement(x: str, bits: int) -> str:
+    for i in range(bits - len(x)):
+        x = "0" + x
+    x_list = list(x)
+    for i in range(bits):
+        if x_list[bits - i - 1] == "1":
+            x_list[bits - i - 1] = "0"
+        else:
+            x_list[bits - i - 1] = "1"
+    return "".join(x_list)
+
+
+def unsigned_right_shift_32(x: int) -> int:
+    if x >= 0:
+        return x >> 32
+    else:
+        e = to_bin(x, 64)
+        if len(e) > 32:
+            return int(e[:32], 2)
+        else:
+            return x
+
+
+def is_random(seed) -> bool:
+    a = Int64(seed)
+    b = Int64(18218081)
+    c = Int64(1) << 48
+    d = Int64(7847617)
+    e = ((d * ((unsigned_right_shift_32(a) * 24667315 + b * Int32(a) + 67552711) >> 32) - b *
+          ((-4824621 * unsigned_right_shift_32(a) + d * Int32(a) + d) >> 32)) - 11) * Int64(0xdfe05bcb1365) % c
+    return ((((Int64(0x5deece66d) * e + 11) % c) >> 16) << 32) + Int32(((Int64(0xbb20b4600a69) * e + Int64(0x40942de6ba)) % c) >> 16) == a
+
+
+# end of the old seed_utils.py
+
+
+def next_long(rng: random.Random) -> int:
+    """
+    new Random().nextLong(), a seed is_random should accept
+    """
+    state = rng.getrandbits(48)
+    state = (state * 0x5deece66d + 0xb) & seed_utils.MASK_48
+    high = seed_utils.to_int32(state >> 16)
+    state = (state * 0x5deece66d + 0xb) & seed_utils.MASK_48
+    low = seed_utils.to_int32(state >> 16)
+    return seed_utils.to_int64((high << 32) + low)
+
+
+def generated_seeds(count: int) -> list[int]:
+    rng = random.Random(0)
+    return [next_long(rng) for _ in range(count)]
+
+
+def other_seeds(count: int) -> list[int]:
+    rng = random.Random(1)
+    seeds = [seed_utils.to_int64(rng.getrandbits(64)) for _ in range(count // 2)]
+    seeds += [rng.randrange(-10 ** 6, 10 ** 6) for _ in range(count - len(seeds))]
+    return seeds + [0, 1, -1, 2 ** 63 - 1, -2 ** 63, 2 ** 32, -2 ** 32]
+
+
+def edge_seeds(count: int) -> list[int]:
+    """
+    negative seeds with none of their low 32 bits set, where the old unsigned_right_shift_32 is off by one
+    """
+    rng = random.Random(2)
+    return [seed_utils.to_int64(rng.getrandbits(31) << 32 | 1 << 63) for _ in range(count)]
+
+
+@unittest.skipIf(Int64 is None, "needs fixedint")
+class IsRandomTest(unittest.TestCase):
+    def assert_same(self, seeds: list[int]):
+        for seed in seeds:
+            self.assertEqual(seed_utils.is_random(seed), is_random(seed), f"seed {seed}")
+
+    def test_generated_seeds(self):
+        seeds = generated_seeds(2000)
+        self.assert_same(seeds)
+        self.assertTrue(all(seed_utils.is_random(seed) for seed in seeds))
+
+    def test_other_seeds(self):
+        self.assert_same(other_seeds(2000))
+
+    def test_edge_seeds(self):
+        seeds = edge_seeds(2000)
+        self.assertTrue(any(unsigned_right_shift_32(seed) != seed_utils.unsigned_right_shift_32(seed) for seed in seeds))
+        self.assert_same(seeds)
+
+    @unittest.skipIf(np is None, "needs numpy")
+    def test_batch(self):
+        seeds = generated_seeds(1000) + other_seeds(1000) + edge_seeds(1000)
+        expected = [is_random(seed) for seed in seeds]
+        array = np.array(seeds, dtype=np.int64)
+        self.assertEqual(seed_utils.is_random_batch(array).tolist(), expected)
+        self.assertEqual(seed_utils.is_random_batch(array.view(np.uint64)).tolist(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
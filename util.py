@@ -1,4 +1,24 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    import orjson
+
+    # takes bytes, bytearrays and memoryviews (see SaveFS.read_buffer) without copying them
+    json_loads: Callable[[Any], Any] = orjson.loads
+except ImportError:
+    def json_loads(data: Any) -> Any:
+        # json.loads doesn't take memoryviews
+        return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
 def normalize_time(time: str) -> str:
     time = time[3:] if time.startswith("0:0") else time
     time = time[2:] if time.startswith("0:") else time
     return time[:-3] if "." in time else time
+
+
+def default_cache_dir() -> Path:
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home().joinpath(".cache"))).joinpath("saves-verifier")
@@ -0,0 +1,223 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from scan import walk_saves
+
+# inotify(7) event masks
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+IN_IGNORED = 0x8000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT = struct.Struct("iIII")
+
+# the files whose changes mean a save is still being written, see watch
+WATCHED_FILES = ("level.dat", "speedrunigt/record.json")
+
+Stamp = tuple[Optional[tuple[int, int]], ...]
+
+
+def quick_stamp(save_folder: str) -> Stamp:
+    """
+    the size and mtime of level.dat and speedrunigt/record.json, None for files that don't exist (yet)
+    """
+    stamp = []
+    for file in WATCHED_FILES:
+        try:
+            stat = os.stat(os.path.join(save_folder, file))
+            stamp.append((stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class Watcher:
+    """
+    reports which saves under a folder may have changed
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def changes(self, timeout: float) -> set[str]:
+        """
+        waits up to timeout seconds for changes
+
+        :return: the folders of saves that may have changed since the last call
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PollingWatcher(Watcher):
+    """
+    rescans the folder and compares quick stamps, for systems without inotify
+    """
+
+    def __init__(self, root: Path):
+        super().__init__(root)
+        self.stamps = self.scan()
+
+    def scan(self) -> dict[str, Stamp]:
+        return {save: quick_stamp(save) for save, _ in walk_saves(self.root)}
+
+    def changes(self, timeout: float) -> set[str]:
+        time.sleep(timeout)
+        stamps = self.scan()
+        changed = {save for save, stamp in stamps.items() if self.stamps.get(save) != stamp}
+        self.stamps = stamps
+        return changed
+
+
+class InotifyWatcher(Watcher):
+    """
+    watches every folder on the way to a save, each save and its speedrunigt folder with inotify, so nothing has to be
+    rescanned
+    """
+
+    def __init__(self, root: Path):
+        super().__init__(root)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor -> watched folder, and the save each folder belongs to (None for folders above saves)
+        self.folders: dict[int, str] = {}
+        self.saves: dict[str, Optional[str]] = {}
+        self.add_tree(str(root))
+
+    def add_watch(self, folder: str, save: Optional[str]):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd >= 0:
+            self.folders[wd] = folder
+            self.saves[folder] = save
+
+    def add_save(self, save: str):
+        self.add_watch(save, save)
+        speedrunigt = os.path.join(save, "speedrunigt")
+        if os.path.isdir(speedrunigt):
+            self.add_watch(speedrunigt, save)
+
+    def add_tree(self, folder: str) -> set[str]:
+        """
+        watches a new folder and every folder in it, stopping at saves
+
+        :return: the saves found in it
+        """
+        saves = set()
+        stack = [folder]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            if any(entry.name == "level.dat" for entry in entries):
+                saves.add(directory)
+                self.add_save(directory)
+                continue
+            self.add_watch(directory, None)
+            stack.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+        return saves
+
+    def changes(self, timeout: float) -> set[str]:
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0"))
+                offset += EVENT.size + length
+                self.handle(wd, mask, name, changed)
+
+    def handle(self, wd: int, mask: int, name: str, changed: set[str]):
+        folder = self.folders.get(wd)
+        if folder is None:
+            return
+        if mask & IN_IGNORED:
+            # the folder was deleted
+            del self.folders[wd]
+            self.saves.pop(folder, None)
+            return
+        save = self.saves.get(folder)
+        path = os.path.join(folder, name)
+        if save is not None:
+            if save == folder and name == "speedrunigt" and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_watch(path, save)
+            changed.add(save)
+        elif name == "level.dat" and mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            # a folder became a save
+            self.add_save(folder)
+            changed.add(folder)
+        elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+            changed.update(self.add_tree(path))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watcher(root: Path, poll: bool = False) -> Watcher:
+    """
+    :param poll: always rescan instead of using inotify
+    """
+    if not poll:
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            # not linux, or out of inotify instances
+            pass
+    return PollingWatcher(root)
+
+
+def watch(root: Path, debounce: float = 2.0, interval: float = 1.0, poll: bool = False) -> Iterator[Path]:
+    """
+    yields saves under root as they're created or changed, once they've been quiet for a while. saves that already
+    exist aren't yielded until they change
+
+    a save counts as quiet once neither its level.dat nor its speedrunigt/record.json has changed for debounce seconds,
+    the game writes both when it's saved and closed
+
+    :param root: the folder to watch, e.g. a .minecraft/saves folder
+    :param debounce: how long a save has to be quiet for
+    :param interval: how often to check on changes, and to rescan when polling
+    :param poll: always rescan instead of using inotify
+    """
+    source = watcher(root, poll)
+    # save -> the stamp it had when it last changed, and when that was
+    pending: dict[str, tuple[Stamp, float]] = {}
+    try:
+        while True:
+            changed = source.changes(interval if not pending else min(interval, debounce))
+            now = time.monotonic()
+            for save in changed:
+                pending[save] = (quick_stamp(save), now)
+            for save, (stamp, since) in list(pending.items()):
+                current = quick_stamp(save)
+                if current != stamp:
+                    pending[save] = (current, now)
+                elif now - since >= debounce:
+                    del pending[save]
+                    if current[0] is not None:
+                        yield Path(save)
+    finally:
+        source.close()